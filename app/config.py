@@ -4,4 +4,10 @@ from dotenv import load_dotenv
 
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = "HS256"
\ No newline at end of file
+ALGORITHM = "HS256"
+# postgres — полнотекстовый поиск PostgreSQL, memory — инвертированный индекс в памяти (BM25)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "postgres")
+# процессов для генерации уменьшенных копий изображений
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+# префикс internal-location nginx: файлы /media отдаёт прокси через X-Accel-Redirect (sendfile), пусто — отдаёт приложение
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT") or None
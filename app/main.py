@@ -1,16 +1,43 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.routers import cart, categories, products, users, reviews, orders
-from fastapi.staticfiles import StaticFiles
+from app.database import async_session_maker
+from app.tools.suggest import suggest_index
+from app.tools.search import search_backend
+from app.tools.category_tree import category_tree
+from app.tools.images import shutdown_image_pool
+from app.tools.media import MEDIA_DIR
+from app.tools.media_server import MediaFiles
+from app.tools.compression import CompressionMiddleware
+from app.config import MEDIA_ACCEL_REDIRECT
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Строит in-memory индексы при старте приложения, при остановке закрывает пул обработки изображений.
+    """
+    async with async_session_maker() as db:
+        await suggest_index.build(db)
+        await search_backend.build(db)
+        await category_tree.build(db)
+    yield
+    shutdown_image_pool()
 
 
 # Создаём приложение FastAPI
 app = FastAPI(
     title="FastAPI Интернет-магазин",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
-app.mount("/media", StaticFiles(directory="media"), name="media")
+# Сжатие JSON-ответов; изображения из /media middleware пропускает по content-type
+app.add_middleware(CompressionMiddleware)
+
+app.mount("/media", MediaFiles(directory=MEDIA_DIR, accel_redirect=MEDIA_ACCEL_REDIRECT), name="media")
 
 # Подключаем маршруты категорий
 app.include_router(categories.router)
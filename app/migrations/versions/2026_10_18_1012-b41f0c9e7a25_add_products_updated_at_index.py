@@ -0,0 +1,31 @@
+"""add products updated_at index
+
+Revision ID: b41f0c9e7a25
+Revises: 6aecaeb6653c
+Create Date: 2026-10-18 10:12:31.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f0c9e7a25'
+down_revision: Union[str, Sequence[str], None] = '6aecaeb6653c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Индекс был нужен для max(updated_at) в ETag списка товаров. Версию каталога теперь
+    # ведёт data_versions (f3b9d1c64a20), индекс стал лишней ценой записи — ревизия пустая,
+    # а где он уже создан, его удаляет f3b9d1c64a20.
+    pass
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
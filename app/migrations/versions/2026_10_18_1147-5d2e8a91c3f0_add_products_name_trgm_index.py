@@ -0,0 +1,31 @@
+"""add products name trgm index
+
+Revision ID: 5d2e8a91c3f0
+Revises: b41f0c9e7a25
+Create Date: 2026-10-18 11:47:05.226914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8a91c3f0'
+down_revision: Union[str, Sequence[str], None] = 'b41f0c9e7a25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_products_name_trgm', 'products', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_name_trgm', table_name='products', postgresql_using='gin')
+    # расширение не удаляем: им могут пользоваться другие объекты базы
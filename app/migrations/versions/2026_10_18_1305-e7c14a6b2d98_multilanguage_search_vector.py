@@ -0,0 +1,54 @@
+"""multilanguage search vector
+
+Revision ID: e7c14a6b2d98
+Revises: 5d2e8a91c3f0
+Create Date: 2026-10-18 13:05:48.901733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c14a6b2d98'
+down_revision: Union[str, Sequence[str], None] = '5d2e8a91c3f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TSV_RU_EN = """
+            setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+            ||
+            setweight(to_tsvector('english', coalesce(name, '')), 'A')
+            ||
+            setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+            ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            """
+
+TSV_EN = """
+            setweight(to_tsvector('english', coalesce(name, '')), 'A')
+            || 
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            """
+
+
+def _rebuild_tsv(expression: str) -> None:
+    # выражение генерируемой колонки в PostgreSQL 16 не меняется на месте —
+    # пересоздаём колонку и GIN-индекс
+    op.drop_index('ix_products_tsv_gin', table_name='products', postgresql_using='gin')
+    op.drop_column('products', 'tsv')
+    op.add_column('products', sa.Column('tsv', postgresql.TSVECTOR(), sa.Computed(expression, persisted=True), nullable=False))
+    op.create_index('ix_products_tsv_gin', 'products', ['tsv'], unique=False, postgresql_using='gin')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rebuild_tsv(TSV_RU_EN)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild_tsv(TSV_EN)
@@ -0,0 +1,46 @@
+"""add composite and partial indexes
+
+Revision ID: a93f5c27d4e1
+Revises: e7c14a6b2d98
+Create Date: 2026-10-18 15:34:08.271946
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93f5c27d4e1'
+down_revision: Union[str, Sequence[str], None] = 'e7c14a6b2d98'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_products_category_id_active', 'products', ['category_id', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_products_seller_id_active', 'products', ['seller_id', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_products_price_active', 'products', ['price'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_reviews_product_id_active', 'reviews', ['product_id'], unique=False,
+                    postgresql_where=sa.text('is_active'), postgresql_include=['grade'])
+    op.create_index('ix_reviews_user_id_product_id_active', 'reviews', ['user_id', 'product_id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', sa.text('created_at DESC')], unique=False)
+    # префикс (user_id) покрыт составным индексом
+    op.drop_index(op.f('ix_orders_user_id'), table_name='orders')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_orders_user_id'), 'orders', ['user_id'], unique=False)
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
+    op.drop_index('ix_reviews_user_id_product_id_active', table_name='reviews')
+    op.drop_index('ix_reviews_product_id_active', table_name='reviews')
+    op.drop_index('ix_products_price_active', table_name='products')
+    op.drop_index('ix_products_seller_id_active', table_name='products')
+    op.drop_index('ix_products_category_id_active', table_name='products')
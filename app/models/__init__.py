@@ -4,5 +4,7 @@ from .users import User
 from .reviews import Review
 from .cart_items import CartItem
 from .orders import Order, OrderItem
+from .media_files import MediaFile
+from .data_versions import DataVersion
 
-__all__ = ["Category", "Product", "User", "Review", "CartItem", "Order", "OrderItem"]
\ No newline at end of file
+__all__ = ["Category", "Product", "User", "Review", "CartItem", "Order", "OrderItem", "MediaFile", "DataVersion"]
\ No newline at end of file
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from sqlalchemy import DDL, BigInteger, DateTime, String, event, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class DataVersion(Base):
+    """
+    Монотонные версии наборов данных для ETag.
+    Строка 'products' увеличивается триггером один раз на каждую транзакцию, изменившую products,
+    в момент её коммита (отложенный constraint trigger). Новое значение становится видно вместе
+    с изменениями и растёт в порядке коммитов — в отличие от max(updated_at), где now() — время
+    начала транзакции и долгий импорт может закоммитить метку старше текущего максимума.
+    """
+    __tablename__ = "data_versions"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# Для create_all (скрипты в benchmarks/); у миграции f3b9d1c64a20 своя копия этого DDL
+PRODUCTS_VERSION_DDL = (
+    "INSERT INTO data_versions (name, version) VALUES ('products', 0) ON CONFLICT DO NOTHING",
+    """
+    CREATE OR REPLACE FUNCTION bump_products_version() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        -- одна прибавка на транзакцию, сколько бы строк она ни изменила
+        IF current_setting('app.products_version_xact', true) IS DISTINCT FROM txid_current()::text THEN
+            PERFORM set_config('app.products_version_xact', txid_current()::text, true);
+            UPDATE data_versions SET version = version + 1, updated_at = clock_timestamp()
+            WHERE name = 'products';
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    # у constraint trigger нет OR REPLACE, а create_all в benchmarks/ вызывается на каждом запуске
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger
+                       WHERE tgname = 'products_version_bump' AND tgrelid = 'products'::regclass) THEN
+            CREATE CONSTRAINT TRIGGER products_version_bump
+            AFTER INSERT OR UPDATE OR DELETE ON products
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE FUNCTION bump_products_version();
+        END IF;
+    END
+    $$
+    """,
+)
+
+for statement in PRODUCTS_VERSION_DDL:
+    # после создания всех таблиц: триггеру нужна products
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql"))
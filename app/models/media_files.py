@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class MediaFile(Base):
+    """
+    Файл в контентно-адресуемом хранилище media/ и число ссылок на него (products.image_url).
+    """
+    __tablename__ = "media_files"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 содержимого
+    url: Mapped[str] = mapped_column(String(200), unique=True, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    refcount: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
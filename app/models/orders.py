@@ -1,6 +1,6 @@
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import DateTime, ForeignKey, Integer, func, String, Numeric
+from sqlalchemy import DateTime, ForeignKey, Integer, func, String, Numeric, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -11,7 +11,7 @@ class Order(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(
-        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
     total_amount: Mapped[Decimal] = mapped_column(Numeric(10, 2), default=0, nullable=False)
@@ -28,6 +28,11 @@ class Order(Base):
     )
 
 
+# Список заказов пользователя: WHERE user_id ORDER BY created_at DESC LIMIT —
+# читается по индексу без сортировки; заменяет ix_orders_user_id
+Index("ix_orders_user_id_created_at", Order.user_id, Order.created_at.desc())
+
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
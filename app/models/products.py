@@ -8,6 +8,10 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
 
+# Конфигурации полнотекстового поиска, которые есть в Product.tsv
+SEARCH_CONFIGS = ("russian", "english")
+
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -25,12 +29,18 @@ class Product(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
+    # Каталог в основном на русском: храним лексемы обеих конфигураций,
+    # поиск на любом языке из SEARCH_CONFIGS идёт по этому столбцу и индексу ix_products_tsv_gin
     tsv: Mapped[TSVECTOR] = mapped_column(
         TSVECTOR,
         Computed(
             """
+            setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+            ||
             setweight(to_tsvector('english', coalesce(name, '')), 'A')
-            || 
+            ||
+            setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+            ||
             setweight(to_tsvector('english', coalesce(description, '')), 'B')
             """,
             persisted=True,
@@ -48,4 +58,11 @@ class Product(Base):
 
     __table_args__ = (
         Index("ix_products_tsv_gin", "tsv", postgresql_using="gin"),
+        Index("ix_products_name_trgm", "name", postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}),
+        # частичные индексы под фильтры каталога: почти все запросы идут с is_active,
+        # id в ключе даёт порядок ORDER BY id без сортировки
+        Index("ix_products_category_id_active", "category_id", "id", postgresql_where=text("is_active")),
+        Index("ix_products_seller_id_active", "seller_id", "id", postgresql_where=text("is_active")),
+        Index("ix_products_price_active", "price", postgresql_where=text("is_active")),
     )
@@ -1,6 +1,6 @@
 from app.database import Base
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, Boolean, DateTime, Text, Integer
+from sqlalchemy import ForeignKey, Boolean, DateTime, Text, Integer, Index, text
 from datetime import datetime
 
 
@@ -16,4 +16,13 @@ class Review(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
 
     user: Mapped["User"] = relationship("User", back_populates="reviews")
-    product: Mapped["Product"] = relationship("Product", back_populates="reviews")
\ No newline at end of file
+    product: Mapped["Product"] = relationship("Product", back_populates="reviews")
+
+    __table_args__ = (
+        # отзывы товара и avg(grade) для рейтинга — grade в INCLUDE, avg считается по индексу
+        Index("ix_reviews_product_id_active", "product_id",
+              postgresql_where=text("is_active"), postgresql_include=["grade"]),
+        # проверка «один активный отзыв от пользователя на товар»
+        Index("ix_reviews_user_id_product_id_active", "user_id", "product_id",
+              postgresql_where=text("is_active")),
+    )
\ No newline at end of file
@@ -1,8 +1,8 @@
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import delete, select
+from sqlalchemy import Integer, Row, delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.auth import get_current_user
 from app.db_depends import get_async_db
@@ -15,38 +15,64 @@ from app.schemas import (
     CartItemCreate,
     CartItemUpdate,
 )
+from app.tools.serialization import FastSerializer
+from app.tools.read_queries import PRODUCT_READ_COLUMNS, fetch_cart_items, product_exists
 
 
 router = APIRouter(prefix="/cart", tags=["cart"])
 
+cart_serializer = FastSerializer(CartSchema)
 
-async def _ensure_product_available(db: AsyncSession, product_id: int) -> None:
-    result = await db.scalars(
-        select(ProductModel).where(
-            ProductModel.id == product_id,
-            ProductModel.is_active == True,
+
+# Изменения корзины — по одному оператору на запрос: проверка товара, запись и данные
+# для ответа в одном SQL. Уникальный ключ (user_id, product_id) разрешает гонку
+# параллельных добавлений в самой базе, без чтения перед записью.
+
+
+def _cart_item_payload(row: Row) -> dict:
+    mapping = row._mapping
+    return {
+        "id": mapping["cart_item_id"],
+        "quantity": mapping["cart_item_quantity"],
+        "product": {column.key: mapping[column.key] for column in PRODUCT_READ_COLUMNS},
+    }
+
+
+async def _upsert_cart_item(db: AsyncSession, user_id: int, product_id: int, quantity: int) -> Row | None:
+    """
+    INSERT ... SELECT из активного товара ON CONFLICT DO UPDATE: новая позиция или
+    увеличение количества. None — товара нет или он неактивен.
+    """
+    available = select(literal(user_id, Integer), ProductModel.id, literal(quantity, Integer)).where(
+        ProductModel.id == product_id,
+        ProductModel.is_active == True,
+    )
+    stmt = insert(CartItemModel).from_select(["user_id", "product_id", "quantity"], available)
+    upserted = (
+        stmt.on_conflict_do_update(
+            constraint="uq_cart_items_user_product",
+            set_={"quantity": CartItemModel.quantity + stmt.excluded.quantity, "updated_at": func.now()},
         )
+        .returning(CartItemModel.id, CartItemModel.quantity, CartItemModel.product_id)
+        .cte("upserted")
     )
-    product = result.first()
-    if not product:
-        raise HTTPException(
+    return (await db.execute(
+        select(
+            upserted.c.id.label("cart_item_id"),
+            upserted.c.quantity.label("cart_item_quantity"),
+            *PRODUCT_READ_COLUMNS,
+        ).select_from(upserted.join(ProductModel, ProductModel.id == upserted.c.product_id))
+    )).first()
+
+
+async def _cart_item_not_found(db: AsyncSession, product_id: int) -> HTTPException:
+    # только на пути ошибки: уточняем, чего именно нет
+    if not await product_exists(db, product_id):
+        return HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found or inactive",
         )
-
-
-async def _get_cart_item(
-    db: AsyncSession, user_id: int, product_id: int
-) -> CartItemModel | None:
-    result = await db.scalars(
-        select(CartItemModel)
-        .options(selectinload(CartItemModel.product))
-        .where(
-            CartItemModel.user_id == user_id,
-            CartItemModel.product_id == product_id,
-        )
-    )
-    return result.first()
+    return HTTPException(status_code=404, detail="Cart item not found")
 
 
 @router.get("/", response_model=CartSchema)
@@ -54,13 +80,7 @@ async def get_cart(
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    result = await db.scalars(
-        select(CartItemModel)
-        .options(selectinload(CartItemModel.product))
-        .where(CartItemModel.user_id == current_user.id)
-        .order_by(CartItemModel.id)
-    )
-    items = result.all()
+    items = await fetch_cart_items(db, current_user.id)
 
     total_quantity = sum(item.quantity for item in items)
     price_items = (
@@ -70,12 +90,12 @@ async def get_cart(
     )
     total_price_decimal = sum(price_items, Decimal("0.00"))
 
-    return CartSchema(
-        user_id=current_user.id,
-        items=items,
-        total_quantity=total_quantity,
-        total_price=total_price_decimal
-    )
+    return cart_serializer.response({
+        "user_id": current_user.id,
+        "items": items,
+        "total_quantity": total_quantity,
+        "total_price": total_price_decimal,
+    })
 
 
 @router.post("/items", response_model=CartItemSchema, status_code=status.HTTP_201_CREATED)
@@ -84,22 +104,14 @@ async def add_item_to_cart(
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    await _ensure_product_available(db, payload.product_id)
-
-    cart_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    if cart_item:
-        cart_item.quantity += payload.quantity
-    else:
-        cart_item = CartItemModel(
-            user_id=current_user.id,
-            product_id=payload.product_id,
-            quantity=payload.quantity,
+    row = await _upsert_cart_item(db, current_user.id, payload.product_id, payload.quantity)
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found or inactive",
         )
-        db.add(cart_item)
-
     await db.commit()
-    updated_item = await _get_cart_item(db, current_user.id, payload.product_id)
-    return updated_item
+    return _cart_item_payload(row)
 
 
 @router.put("/items/{product_id}", response_model=CartItemSchema)
@@ -109,16 +121,27 @@ async def update_cart_item(
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    await _ensure_product_available(db, product_id)
-
-    cart_item = await _get_cart_item(db, current_user.id, product_id)
-    if not cart_item:
-        raise HTTPException(status_code=404, detail="Cart item not found")
-
-    cart_item.quantity = payload.quantity
+    # UPDATE ... FROM products: количество меняется, только если товар активен
+    row = (await db.execute(
+        update(CartItemModel)
+        .where(
+            CartItemModel.user_id == current_user.id,
+            CartItemModel.product_id == product_id,
+            ProductModel.id == CartItemModel.product_id,
+            ProductModel.is_active == True,
+        )
+        .values(quantity=payload.quantity)
+        .returning(
+            CartItemModel.id.label("cart_item_id"),
+            CartItemModel.quantity.label("cart_item_quantity"),
+            *PRODUCT_READ_COLUMNS,
+        )
+        .execution_options(synchronize_session=False)
+    )).first()
+    if row is None:
+        raise await _cart_item_not_found(db, product_id)
     await db.commit()
-    updated_item = await _get_cart_item(db, current_user.id, product_id)
-    return updated_item
+    return _cart_item_payload(row)
 
 
 @router.delete("/items/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -127,11 +150,14 @@ async def remove_item_from_cart(
     db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    cart_item = await _get_cart_item(db, current_user.id, product_id)
-    if not cart_item:
+    deleted = await db.scalar(
+        delete(CartItemModel)
+        .where(CartItemModel.user_id == current_user.id, CartItemModel.product_id == product_id)
+        .returning(CartItemModel.id)
+        .execution_options(synchronize_session=False)
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Cart item not found")
-
-    await db.delete(cart_item)
     await db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.categories import Category as CategoryModel
-from app.schemas import Category as CategorySchema, CategoryCreate
+from app.schemas import Category as CategorySchema, CategoryCreate, CategoryTreeNode
 from app.db_depends import get_async_db
+from app.tools.suggest import suggest_index
+from app.tools.category_tree import category_tree, categories_version
+from app.tools.read_queries import fetch_active_categories
+from app.tools.http_cache import make_etag, is_not_modified, not_modified, cache_headers
 
 # Создаём маршрутизатор с префиксом и тегом
 router = APIRouter(
@@ -14,13 +18,29 @@ router = APIRouter(
 
 
 @router.get("/", response_model=list[CategorySchema])
-async def get_all_categories(db: AsyncSession = Depends(get_async_db)):
+async def get_all_categories(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """
     Возвращает список всех категорий товаров.
+    Отдаёт ETag по версии справочника и 304, если он не менялся.
     """
-    result = await db.scalars(select(CategoryModel).where(CategoryModel.is_active == True))
-    categories = result.all()
-    return categories
+    etag = make_etag("categories", await categories_version(db))
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+
+    return await fetch_active_categories(db)
+
+
+@router.get("/tree", response_model=list[CategoryTreeNode])
+async def get_category_tree(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Возвращает дерево активных категорий с числом активных товаров в каждом узле.
+    JSON собирается один раз при перестройке дерева и отдаётся как есть.
+    """
+    content, etag = await category_tree.serialized(db)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return Response(content=content, media_type="application/json", headers=cache_headers(etag))
 
 
 @router.post("/", response_model=CategorySchema, status_code=status.HTTP_201_CREATED)
@@ -42,6 +62,8 @@ async def create_category(category: CategoryCreate, db: AsyncSession = Depends(g
     db.add(db_category)
     await db.commit()
     await db.refresh(db_category)
+    suggest_index.category_saved(db_category)
+    category_tree.invalidate()
     return db_category
 
 
@@ -75,6 +97,8 @@ async def update_category(category_id: int, category: CategoryCreate, db: AsyncS
         .values(**update_data)
     )
     await db.commit()
+    suggest_index.category_saved(db_category)
+    category_tree.invalidate()
     return db_category
 
 
@@ -92,5 +116,7 @@ async def delete_category(category_id: int, db: AsyncSession = Depends(get_async
     # Логическое удаление категории (установка is_active=False)
     await db.execute(update(CategoryModel).where(CategoryModel.id == category_id).values(is_active=False))
     await db.commit()
+    suggest_index.category_removed(category_id)
+    category_tree.invalidate()
 
     return category
\ No newline at end of file
@@ -11,12 +11,17 @@ from app.models.cart_items import CartItem as CartItemModel
 from app.models.orders import Order as OrderModel, OrderItem as OrderItemModel
 from app.models.users import User as UserModel
 from app.schemas import Order as OrderSchema, OrderList
+from app.tools.cache import invalidate_product
+from app.tools.counts import invalidate_product_counts
+from app.tools.serialization import FastSerializer
 
 router = APIRouter(
     prefix="/orders",
     tags=["orders"],
 )
 
+order_list_serializer = FastSerializer(OrderList)
+
 
 async def _load_order_with_items(db: AsyncSession, order_id: int) -> OrderModel | None:
     result = await db.scalars(
@@ -88,6 +93,9 @@ async def checkout_order(
 
     await db.execute(delete(CartItemModel).where(CartItemModel.user_id == current_user.id))
     await db.commit()
+    # остатки изменились — фильтр in_stock мог поменять total, карточки устарели
+    invalidate_product_counts()
+    invalidate_product(*(cart_item.product_id for cart_item in cart_items))
 
     created_order = await _load_order_with_items(db, order.id)
     if not created_order:
@@ -121,7 +129,8 @@ async def list_orders(
     )
     orders = result.all()
 
-    return OrderList(items=orders, total=total or 0, page=page, page_size=page_size)
+    return order_list_serializer.response(
+        {"items": orders, "total": total or 0, "page": page, "page_size": page_size})
 
 
 @router.get("/{order_id}", response_model=OrderSchema)
@@ -1,27 +1,51 @@
-from fastapi import APIRouter, Depends, status, HTTPExcep4tion, Query
+from fastapi import APIRouter, Body, Depends, status, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from collections.abc import AsyncIterator
+from typing import Literal
 from datetime import datetime
 
-from app.schemas import ProductCreate, Product as ProductSchema, Review as ReviewSchema, ProductList
+from app.schemas import (
+    ProductCreate, Product as ProductSchema, Review as ReviewSchema, ProductList, ProductFilter,
+    Suggestions, BulkImportResult, ProductBulkUpdateItem, ProductBulkUpdateResult,
+)
 from app.db_depends import get_async_db
-from app.auth import get_current_seller
+from app.auth import get_current_seller, get_current_admin
 
 from app.models.products import Product as ProductModel
 from app.models.categories import Category as CategoryModel
-from app.models.reviews import Review as ReviewModel
 from app.models.users import User as UserModel
+from app.models.data_versions import DataVersion as DataVersionModel
+from app.tools.pagination import encode_cursor, decode_cursor
+from app.tools.cache import product_cache, invalidate_product
+from app.tools.http_cache import make_etag, has_conditional_headers, is_not_modified, not_modified, cache_headers
+from app.tools.facets import parse_facets, load_facets
+from app.tools.suggest import suggest_index, MAX_SUGGEST_LIMIT
+from app.tools.search import search_backend
+from app.tools.bulk_import import ImportFormat, detect_format, iter_upload_rows, read_batch
+from app.tools.category_tree import category_tree
+from app.tools.fields import (
+    parse_fields, product_columns, product_fields_model, product_list_fields_model, dump_products,
+)
+from app.tools.serialization import FastSerializer, json_response
+from app.tools.media_store import store_product_image, release_product_image, purge_product_image
+from app.tools.read_queries import fetch_product, product_exists, fetch_product_reviews
+from app.tools.counts import CountMode, product_count_cache, invalidate_product_counts, estimate_active_products
 
-from sqlalchemy import select, func, desc, update, and_
+from sqlalchemy import select, func, desc, update, insert, values, column, cast, and_, or_, Label, Integer, Numeric
 from sqlalchemy.ext.asyncio import AsyncSession
-from pathlib import Path
-import uuid
 from fastapi import UploadFile, File, Form, HTTPException, status
 
 
-BASE_DIR = Path(__file__).resolve().parent.parent.parent
-MEDIA_ROOT = BASE_DIR / "media" / "products"
-MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
-ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
-MAX_IMAGE_SIZE = 2 * 1024 * 1024  # 2 097 152 байт
+STREAM_BATCH_SIZE = 500  # строк на один fetch серверного курсора
+TRGM_SIMILARITY_THRESHOLD = 0.3  # порог pg_trgm по умолчанию
+BULK_BATCH_SIZE = 1000  # строк на один INSERT/UPDATE в массовых операциях
+MAX_BULK_UPDATE_ITEMS = 10_000
+
+# Быстрая сериализация больших ответов: схема та же, что в response_model
+product_list_serializer = FastSerializer(ProductList)
+reviews_serializer = FastSerializer(list[ReviewSchema])
 
 
 # Создаём маршрутизатор для товаров
@@ -47,7 +71,7 @@ async def create_product(
     if category_id is None:
         raise HTTPException(status_code=400, detail="Category not found or inactive")
 
-    image_url = await save_product_image(image) if image else None
+    image_url = await save_product_image(db, image) if image else None
 
     db_product = ProductModel(
         **product.model_dump(),
@@ -58,108 +82,477 @@ async def create_product(
     db.add(db_product)
     await db.commit()
     await db.refresh(db_product)
+    invalidate_product_counts()
+    category_tree.invalidate_counts()
+    suggest_index.product_saved(db_product)
+    search_backend.product_saved(db_product)
 
     return db_product
 
 
-@router.get("/2", response_model=ProductList, status_code=status.HTTP_200_OK)
-async def get_all_products_2(
-        page: int = Query(1, ge=1),
-        page_size: int = Query(20, ge=1, le=100),
-        category_id: int | None = Query(
-            None, description="ID категории для фильтрации"),
-        search: str | None = Query(None, min_length=1, description="Поиск по названию товара"),
-        min_price: float | None = Query(
-            None, ge=0, description="Минимальная цена товара"),
-        max_price: float | None = Query(
-            None, ge=0, description="Максимальная цена товара"),
-        in_stock: bool | None = Query(
-            None, description="true — только товары в наличии, false — только без остатка"),
-        seller_id: int | None = Query(
-            None, description="ID продавца для фильтрации"),
-        created_date: datetime | None = Query(
-            None, description="Дата добавления"),
-        db: AsyncSession = Depends(get_async_db)
+@router.post("/bulk", response_model=BulkImportResult, status_code=status.HTTP_200_OK)
+async def import_products(
+    file: UploadFile = File(..., description="CSV с заголовком или NDJSON: name, description, price, stock, category_id"),
+    import_format: ImportFormat | None = Query(
+        None, alias="format", description="csv или ndjson; по умолчанию — по расширению файла"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller),
 ):
     """
-    Возвращает список всех товаров.
+    Массовый импорт товаров продавца.
+    Файл читается построчно, каждая строка проверяется схемой ProductCreate,
+    корректные строки вставляются пачками многострочным INSERT, по ошибочным возвращается отчёт.
     """
+    fmt = detect_format(file, import_format)
+    rows = iter_upload_rows(file.file, fmt)
+    known_categories: dict[int, bool] = {}
+    created = 0
+    errors: list[dict] = []
+    last_row = 1 if fmt == "csv" else 0  # в CSV строка 1 — заголовок
+
+    while True:
+        # строки, прочитанные до ошибки разбора, проверяются и вставляются как обычно
+        batch, parse_error = await run_in_threadpool(read_batch, rows, BULK_BATCH_SIZE)
+        if batch:
+            last_row = batch[-1][0]
+
+        valid: list[tuple[int, ProductCreate]] = []
+        for row_number, data in batch:
+            if isinstance(data, str):
+                errors.append({"row": row_number, "errors": [data]})
+                continue
+            try:
+                valid.append((row_number, ProductCreate.model_validate(data)))
+            except ValidationError as exc:
+                errors.append({"row": row_number, "errors": [
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+                ]})
+
+        # категории проверяем одним запросом на пачку, найденные запоминаем
+        unknown_ids = {product.category_id for _, product in valid} - known_categories.keys()
+        if unknown_ids:
+            found = set(await db.scalars(
+                select(CategoryModel.id).where(CategoryModel.id.in_(unknown_ids), CategoryModel.is_active == True)
+            ))
+            known_categories.update({category_id: category_id in found for category_id in unknown_ids})
+
+        rows_to_insert = []
+        for row_number, product in valid:
+            if not known_categories[product.category_id]:
+                errors.append({"row": row_number, "errors": ["category_id: Category not found or inactive"]})
+                continue
+            rows_to_insert.append({**product.model_dump(), "seller_id": current_user.id})
+
+        if rows_to_insert:
+            # executemany по INSERT ... RETURNING SQLAlchemy собирает в многострочные VALUES
+            inserted = (await db.execute(
+                insert(ProductModel).returning(
+                    ProductModel.id, ProductModel.name, ProductModel.description,
+                    ProductModel.rating, ProductModel.is_active,
+                ),
+                rows_to_insert,
+            )).all()
+            await db.commit()
+            created += len(inserted)
+            for product in inserted:
+                suggest_index.product_saved(product)
+                search_backend.product_saved(product)
+
+        if parse_error is not None:
+            # разбор оборвался на строке, следующей за последней прочитанной
+            errors.append({"row": last_row + 1, "errors": [parse_error]})
+            break
+        if not batch:
+            break
+
+    if created:
+        invalidate_product_counts()
+        category_tree.invalidate_counts()
+
+    return {"created": created, "failed": len(errors), "errors": errors}
+
+
+@router.patch("/bulk", response_model=ProductBulkUpdateResult)
+async def bulk_update_products(
+    changes: list[ProductBulkUpdateItem] = Body(..., max_length=MAX_BULK_UPDATE_ITEMS),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_seller),
+):
     """
-    Возвращает список всех активных товаров.
+    Массово меняет цены и остатки товаров продавца.
+    Каждая пачка — один UPDATE ... FROM (VALUES ...), владелец проверяется в том же запросе.
+    """
+    # при повторе id побеждает последнее изменение
+    by_id = {item.id: item for item in changes}
+    items = list(by_id.values())
+    applied: list[int] = []
+
+    for start in range(0, len(items), BULK_BATCH_SIZE):
+        batch = items[start:start + BULK_BATCH_SIZE]
+        changes_table = values(
+            column("id", Integer), column("price", Numeric(10, 2)), column("stock", Integer),
+            name="changes",
+        ).data([(item.id, item.price, item.stock) for item in batch])
+        # NULL в VALUES — «не менять»; cast нужен, если в пачке вся колонка NULL (тогда она text)
+        result = await db.execute(
+            update(ProductModel)
+            .where(
+                ProductModel.id == changes_table.c.id,
+                ProductModel.seller_id == current_user.id,
+                ProductModel.is_active == True,
+            )
+            .values(
+                price=func.coalesce(cast(changes_table.c.price, Numeric(10, 2)), ProductModel.price),
+                stock=func.coalesce(cast(changes_table.c.stock, Integer), ProductModel.stock),
+            )
+            .returning(ProductModel.id)
+            .execution_options(synchronize_session=False)
+        )
+        applied.extend(result.scalars())
+
+    await db.commit()
+    if applied:
+        invalidate_product_counts()
+        invalidate_product(*applied)
+
+    applied_ids = set(applied)
+    return {
+        "applied": sorted(applied_ids),
+        "rejected": [product_id for product_id in by_id if product_id not in applied_ids],
+    }
+
+
+def _build_product_filters(
+        params: ProductFilter,
+        matcher: str = "fts",
+        category_ids: list[int] | None = None,
+        dialect: str = "postgresql",
+) -> tuple[list, Label | None]:
+    """
+    Собирает условия WHERE по фильтрам списка товаров.
+    Возвращает условия и колонку ранга (если задан поиск).
+    matcher: "fts" — полнотекстовый поиск через search_backend, "trigram" — нечёткий по pg_trgm.
+    category_ids: поддерево категории из _category_subtree (для include_descendants).
+    dialect: диалект базы сессии — от него зависит SQL поиска в памяти.
     """
-    if min_price is not None and max_price is not None and min_price > max_price:
+    if params.min_price is not None and params.max_price is not None and params.min_price > params.max_price:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="min_price не может быть больше max_price",
         )
     filters = [ProductModel.is_active == True]
 
-    if category_id is not None:
-        filters.append(ProductModel.category_id == category_id)
-    if min_price is not None:
-        filters.append(ProductModel.price >= min_price)
-    if max_price is not None:
-        filters.append(ProductModel.price <= max_price)
-    if in_stock is not None:
-        filters.append(ProductModel.stock > 0 if in_stock else ProductModel.stock == 0)
-    if seller_id is not None:
-        filters.append(ProductModel.seller_id == seller_id)
-    if created_date is not None:
-        filters.append(ProductModel.created_at == created_date)
-
-    total_stmt = select(func.count()).select_from(ProductModel).where(*filters)
+    if category_ids is not None:
+        filters.append(ProductModel.category_id.in_(category_ids))
+    elif params.category_id is not None:
+        filters.append(ProductModel.category_id == params.category_id)
+    if params.min_price is not None:
+        filters.append(ProductModel.price >= params.min_price)
+    if params.max_price is not None:
+        filters.append(ProductModel.price <= params.max_price)
+    if params.in_stock is not None:
+        filters.append(ProductModel.stock > 0 if params.in_stock else ProductModel.stock == 0)
+    if params.seller_id is not None:
+        filters.append(ProductModel.seller_id == params.seller_id)
+    if params.created_date is not None:
+        filters.append(ProductModel.created_at == params.created_date)
 
     rank_col = None
-    if search:
-        search_value = search.strip()
-        if search_value:
-            ts_query = func.websearch_to_tsquery('english', search_value)
-            filters.append(ProductModel.tsv.op('@@')(ts_query))
-            rank_col = func.ts_rank_cd(ProductModel.tsv, ts_query).label("rank")
-            # total с учётом полнотекстового фильтра
-            total_stmt = select(func.count()).select_from(ProductModel).where(*filters)
+    if params.search_value and matcher == "trigram":
+        # % использует ix_products_name_trgm; порог задаёт _set_similarity_threshold
+        filters.append(ProductModel.name.op('%')(params.search_value))
+        rank_col = func.similarity(ProductModel.name, params.search_value).label("rank")
+    elif params.search_value:
+        match_filter, rank = search_backend.match(params.search_value, params.lang, dialect)
+        filters.append(match_filter)
+        rank_col = rank.label("rank")
 
-    total = await db.scalar(total_stmt) or 0
+    return filters, rank_col
 
-    if rank_col is not None:
-        products_stmt = (
-            select(ProductModel, rank_col)
-            .where(*filters)
-            .order_by(desc(rank_col), ProductModel.id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-        )
-        result = await db.execute(products_stmt)
-        rows = result.all()
-        items = [row[0] for row in rows]    # сами объекты
-        # при желании можно вернуть ранг в ответе
-        # ranks = [row.rank for row in rows]
-    else:
-        products_stmt = (
-            select(ProductModel)
-            .where(*filters)
-            .order_by(ProductModel.id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-        )
-        items = (await db.scalars(products_stmt)).all()
 
-    return {
+async def _category_subtree(db: AsyncSession, params: ProductFilter) -> list[int] | None:
+    """
+    ID категории и её потомков из дерева в памяти — без рекурсивного CTE на каждый запрос.
+    """
+    if not params.include_descendants or params.category_id is None:
+        return None
+    return await category_tree.subtree_ids(db, params.category_id)
+
+
+async def _set_similarity_threshold(db: AsyncSession, threshold: float) -> None:
+    """
+    Порог оператора % действует до конца текущей транзакции.
+    """
+    await db.execute(select(func.set_config("pg_trgm.similarity_threshold", str(threshold), True)))
+
+
+async def _products_version(db: AsyncSession) -> tuple[int | None, datetime | None]:
+    """
+    Версия каталога товаров и время её смены (app/models/data_versions.py).
+    Растёт на каждой транзакции, изменившей products, включая мягкое удаление и остатки.
+    """
+    row = (await db.execute(
+        select(DataVersionModel.version, DataVersionModel.updated_at).where(DataVersionModel.name == "products")
+    )).first()
+    return (row.version, row.updated_at) if row else (None, None)
+
+
+@router.get("/2", response_model=ProductList, status_code=status.HTTP_200_OK)
+async def get_all_products_2(
+        request: Request,
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=1, le=100),
+        cursor: str | None = Query(
+            None, description="Курсор из next_cursor предыдущего ответа (вместо page)"),
+        params: ProductFilter = Depends(ProductFilter.as_query),
+        count_mode: CountMode = Query(
+            CountMode.exact, description="Способ подсчёта total: exact, cached или estimated"),
+        facets: str | None = Query(
+            None, description="Фасеты через запятую: category, seller, price, stock"),
+        similarity: float = Query(
+            TRGM_SIMILARITY_THRESHOLD, gt=0, le=1,
+            description="Порог похожести для нечёткого поиска, если полнотекстовый ничего не нашёл"),
+        fields: str | None = Query(
+            None, description="Поля товара через запятую, например id,name,price (по умолчанию все)"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Возвращает список всех активных товаров.
+    Поддерживает два режима: page/page_size (offset) и cursor (keyset).
+    Если полнотекстовый поиск ничего не нашёл, повторяет его по триграммам (поле matcher).
+    Отдаёт ETag/Last-Modified по версии каталога (с include_descendants — и дерева категорий)
+    и 304 до выполнения выборки.
+    С fields выбираются и сериализуются только нужные колонки.
+    """
+    facet_names = parse_facets(facets)
+    field_names = parse_fields(fields)
+    entities = [ProductModel] if field_names is None else product_columns(field_names)
+    cursor_key = decode_cursor(cursor) if cursor is not None else None
+    # курсор помнит, каким поиском получена предыдущая страница
+    matcher = None
+    if params.search_value:
+        matcher = cursor_key[2] if cursor_key is not None and cursor_key[2] else "fts"
+    category_ids = await _category_subtree(db, params)
+    filters, rank_col = _build_product_filters(params, matcher or "fts", category_ids, db.bind.dialect.name)
+
+    catalog_version, catalog_modified = await _products_version(db)
+    # с include_descendants выборка зависит и от дерева категорий, у которого нет времени изменения
+    tree_version = category_tree.version if category_ids is not None else None
+    if tree_version is not None:
+        catalog_modified = None
+    etag = make_etag("products", catalog_version, tree_version, sorted(request.query_params.multi_items()))
+    if is_not_modified(request, etag, catalog_modified):
+        return not_modified(etag, catalog_modified)
+    headers = cache_headers(etag, catalog_modified)
+
+    if matcher == "trigram":
+        await _set_similarity_threshold(db, similarity)
+
+    total, total_exact = await _get_cached_total(db, count_mode, filters, params, matcher, similarity, tree_version)
+    counted = total is None
+    rows, has_next, total = await _fetch_products_page(
+        db, entities, filters, rank_col, cursor_key, page, page_size, total)
+
+    if matcher == "fts" and total == 0 and search_backend.fuzzy_fallback:
+        # полнотекстовый поиск ничего не нашёл (опечатка, часть слова) — пробуем триграммы
+        matcher = "trigram"
+        await _set_similarity_threshold(db, similarity)
+        filters, rank_col = _build_product_filters(params, matcher, category_ids, db.bind.dialect.name)
+        total, total_exact = await _get_cached_total(db, count_mode, filters, params, matcher, similarity, tree_version)
+        counted = total is None
+        rows, has_next, total = await _fetch_products_page(
+            db, entities, filters, rank_col, None, page, page_size, total)
+
+    # кладём только посчитанный total: set на попадании продлевал бы TTL,
+    # и горячий фильтр в других воркерах никогда бы не устаревал
+    if count_mode == CountMode.cached and counted:
+        product_count_cache.set(params.cache_key() + (matcher, similarity, tree_version), total)
+
+    # без fields первый элемент строки — объект Product, с fields — сама строка из колонок
+    items = [row[0] for row in rows] if field_names is None else rows
+    next_cursor = None
+    if has_next:
+        last_id = items[-1].id
+        if rank_col is not None:
+            next_cursor = encode_cursor(last_id, rows[-1].rank, matcher)
+        else:
+            next_cursor = encode_cursor(last_id)
+
+    facet_counts = await load_facets(db, filters, facet_names) if facet_names else None
+
+    result = {
         "items": items,
         "total": total,
+        "total_exact": total_exact,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
+        "matcher": matcher,
+        "facets": facet_counts,
     }
+    if field_names is not None:
+        return json_response(
+            product_list_fields_model(field_names).model_validate(result).model_dump_json(), headers)
+    return product_list_serializer.response(result, headers)
+
+
+async def _get_cached_total(
+        db: AsyncSession,
+        count_mode: CountMode,
+        filters: list,
+        params: ProductFilter,
+        matcher: str | None,
+        similarity: float,
+        tree_version: str | None,
+) -> tuple[int | None, bool]:
+    """
+    total без отдельного count: из кэша или оценкой планировщика.
+    None — считать точно вместе со страницей.
+    tree_version — версия дерева категорий для include_descendants: запись категорий
+    кэш счётчиков не сбрасывает, а ключ со старой версией просто перестаёт запрашиваться.
+    """
+    if count_mode == CountMode.cached:
+        return product_count_cache.get(params.cache_key() + (matcher, similarity, tree_version)), True
+    if count_mode == CountMode.estimated and len(filters) == 1:
+        return await estimate_active_products(db), False
+    return None, True
+
+
+async def _fetch_products_page(
+        db: AsyncSession,
+        entities: list,
+        filters: list,
+        rank_col: Label | None,
+        cursor_key: tuple[int, float | None, str | None] | None,
+        page: int,
+        page_size: int,
+        total: int | None,
+) -> tuple[list, bool, int]:
+    """
+    Загружает страницу товаров (offset или keyset) и, если total неизвестен,
+    считает его в том же запросе.
+    """
+    total_stmt = select(func.count()).select_from(ProductModel).where(*filters)
+
+    # keyset: вместо offset продолжаем с ключа последней строки предыдущей страницы
+    page_filters = list(filters)
+    if cursor_key is not None:
+        last_id, last_rank, _ = cursor_key
+        if (last_rank is None) != (rank_col is None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor does not match search mode",
+            )
+        if rank_col is not None:
+            rank_expr = rank_col.element
+            page_filters.append(or_(
+                rank_expr < last_rank,
+                and_(rank_expr == last_rank, ProductModel.id > last_id),
+            ))
+        else:
+            page_filters.append(ProductModel.id > last_id)
+    offset = 0 if cursor_key is not None else (page - 1) * page_size
+
+    columns = list(entities)
+    order_by = [ProductModel.id]
+    if rank_col is not None:
+        columns.append(rank_col)
+        order_by.insert(0, desc(rank_col))
+    if total is None:
+        # OVER () считается до LIMIT, но после курсорного условия,
+        # поэтому в keyset-режиме считаем подзапросом по исходным фильтрам
+        count_col = total_stmt.scalar_subquery() if cursor_key is not None else func.count().over()
+        columns.append(count_col.label("total_count"))
+
+    # берём на одну строку больше, чтобы понять, есть ли следующая страница
+    products_stmt = (
+        select(*columns)
+        .where(*page_filters)
+        .order_by(*order_by)
+        .offset(offset)
+        .limit(page_size + 1)
+    )
+    rows = (await db.execute(products_stmt)).all()
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if total is None:
+        # пустая страница не несёт total — добираем отдельным запросом
+        total = rows[0].total_count if rows else (await db.scalar(total_stmt) or 0)
+
+    return rows, has_next, total
 
 
 @router.get("/", response_model=list[ProductSchema], status_code=status.HTTP_200_OK)
-async def get_all_products(db: AsyncSession = Depends(get_async_db)):
+async def get_all_products(
+        params: ProductFilter = Depends(ProductFilter.as_query),
+        stream: Literal["ndjson", "json"] | None = Query(
+            None, description="Потоковая выгрузка: ndjson или json-массив чанками"),
+        fields: str | None = Query(
+            None, description="Поля товара через запятую, например id,name,price (по умолчанию все)"),
+        db: AsyncSession = Depends(get_async_db),
+):
     """
     Возвращает список всех товаров.
+    В режиме stream товары читаются серверным курсором и отдаются по мере чтения,
+    поэтому память воркера не зависит от размера каталога.
+    С fields выбираются и сериализуются только нужные колонки.
+    """
+    field_names = parse_fields(fields)
+    filters, rank_col = _build_product_filters(
+        params, category_ids=await _category_subtree(db, params), dialect=db.bind.dialect.name)
+    order_by = [ProductModel.id] if rank_col is None else [desc(rank_col), ProductModel.id]
+    entity = [ProductModel] if field_names is None else product_columns(field_names)
+    stmt = select(*entity).where(*filters).order_by(*order_by)
+
+    if stream is None:
+        if field_names is not None:
+            return json_response(dump_products(field_names, (await db.execute(stmt)).all()))
+        products = (await db.scalars(stmt)).all()
+        return products
+
+    # сессия из get_async_db закрывается после отправки ответа, курсор живёт весь стрим
+    chunks = _stream_products(db, stmt.execution_options(yield_per=STREAM_BATCH_SIZE), stream, field_names)
+    media_type = "application/x-ndjson" if stream == "ndjson" else "application/json"
+    return StreamingResponse(chunks, media_type=media_type)
+
+
+async def _stream_products(
+        db: AsyncSession, stmt, fmt: str, field_names: tuple[str, ...] | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    Сериализует товары пачками по STREAM_BATCH_SIZE.
     """
-    stmt = select(ProductModel).where(ProductModel.is_active == True)
-    products = (await db.scalars(stmt)).all()
-    return products
+    if field_names is None:
+        schema = ProductSchema
+        result = await db.stream_scalars(stmt)
+    else:
+        schema = product_fields_model(field_names)
+        result = await db.stream(stmt)
+    first = True
+    if fmt == "json":
+        yield b"["
+    async for batch in result.partitions():
+        lines = [schema.model_validate(product).model_dump_json().encode() for product in batch]
+        if fmt == "ndjson":
+            yield b"\n".join(lines) + b"\n"
+        else:
+            yield (b"" if first else b",") + b",".join(lines)
+        first = False
+    if fmt == "json":
+        yield b"]"
+
+
+@router.get("/suggest", response_model=Suggestions)
+async def suggest_products(
+        q: str = Query(..., min_length=1, max_length=100, description="Начало названия товара или категории"),
+        limit: int = Query(10, ge=1, le=MAX_SUGGEST_LIMIT),
+):
+    """
+    Подсказки для поиска по мере набора.
+    Отвечает из префиксного индекса в памяти, без запросов к базе.
+    """
+    return suggest_index.search(q, limit)
 
 
 @router.get("/category/{category_id}", response_model=ProductSchema)
@@ -178,18 +571,64 @@ async def get_products_by_category(category_id: int, db: AsyncSession = Depends(
     return products_by_category
 
 
-@router.get("/{product_id}", response_model=ProductSchema)
-async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+@router.get("/cache/stats")
+async def get_product_cache_stats(current_user: UserModel = Depends(get_current_admin)):
     """
-    Возвращает детальную информацию о товаре по его ID.
+    Счётчики кэша карточек товаров: размер, попадания, промахи, вытеснения.
     """
-    stmt = select(ProductModel).where(ProductModel.id == product_id, ProductModel.is_active == True)
-    product = (await db.scalars(stmt)).first()
+    return product_cache.stats()
 
-    if product is None:
-        return HTTPException(status_code=404, detail="Product not found")
 
-    return product
+@router.get("/{product_id}", response_model=ProductSchema)
+async def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    fields: str | None = Query(
+        None, description="Поля товара через запятую, например id,name,price (по умолчанию все)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Возвращает детальную информацию о товаре по его ID.
+    Читает через кэш карточек (product_cache), отдаёт ETag/Last-Modified по updated_at.
+    С fields при промахе кэша выбираются только нужные колонки (кэш при этом не заполняется).
+    """
+    field_names = parse_fields(fields)
+    product_data = product_cache.get(product_id)
+    if product_data is None and (field_names is not None or has_conditional_headers(request)):
+        # для условного запроса достаточно updated_at, для fields — нужных колонок
+        columns = product_columns(tuple(dict.fromkeys((*(field_names or ()), "updated_at"))))
+        row = (await db.execute(
+            select(*columns).where(ProductModel.id == product_id, ProductModel.is_active == True)
+        )).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        etag = make_etag("product", product_id, row.updated_at.isoformat(), *(field_names or ()))
+        if is_not_modified(request, etag, row.updated_at):
+            return not_modified(etag, row.updated_at)
+        if field_names is not None:
+            return json_response(
+                product_fields_model(field_names).model_validate(row).model_dump_json(),
+                cache_headers(etag, row.updated_at),
+            )
+
+    if product_data is None:
+        product = await fetch_product(db, product_id)
+        if product is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        product_data = ProductSchema.model_validate(product)
+        product_cache.set(product_id, product_data)
+
+    updated_at = product_data.updated_at
+    etag = make_etag("product", product_id, updated_at.isoformat(), *(field_names or ()))
+    if is_not_modified(request, etag, updated_at):
+        return not_modified(etag, updated_at)
+    headers = cache_headers(etag, updated_at)
+    if field_names is not None:
+        return json_response(product_data.model_dump_json(include=set(field_names)), headers)
+    response.headers.update(headers)
+    return product_data
 
 
 @router.put("/{product_id}", response_model=ProductSchema)
@@ -213,6 +652,7 @@ async def update_product(
     category = (await db.scalars(select(CategoryModel).where(CategoryModel.id == product.category_id))).first()
     if category is None:
         raise HTTPException(status_code=404, detail="Category not found or inactive")
+    old_category_id = result_product.category_id
 
     await db.execute(
         update(ProductModel)
@@ -220,12 +660,22 @@ async def update_product(
         .values(**product.model_dump())
     )
 
+    released_image = None
     if image:
-        remove_product_image(result_product.image_url)
-        result_product.image_url = await save_product_image(image)
+        # сначала сохраняем новый файл: если загрузка отклонена, старый остаётся на месте
+        old_image_url = result_product.image_url
+        result_product.image_url = await save_product_image(db, image)
+        released_image = await remove_product_image(db, old_image_url)
 
     await db.commit()
+    await purge_product_image(db, released_image)
     await db.refresh(result_product)
+    invalidate_product_counts()
+    invalidate_product(product_id)
+    if result_product.category_id != old_category_id:
+        category_tree.invalidate_counts()
+    suggest_index.product_saved(result_product)
+    search_backend.product_saved(result_product)
 
     return result_product
 
@@ -244,56 +694,43 @@ async def delete_product(
     if product.seller_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only delete your own products")
 
-    remove_product_image(product.image_url)
-
-    await db.execute(update(ProductModel).where(ProductModel.id == product_id).values(is_active=False))
+    # ссылка на изображение снимается вместе с товаром, иначе счётчик ссылок не сойдётся
+    released_image = await remove_product_image(db, product.image_url)
+    await db.execute(
+        update(ProductModel).where(ProductModel.id == product_id).values(is_active=False, image_url=None)
+    )
     await db.commit()
+    # файл удаляется только после коммита: при откате ссылка на него осталась бы живой
+    await purge_product_image(db, released_image)
+    invalidate_product_counts()
+    category_tree.invalidate_counts()
+    invalidate_product(product_id)
+    suggest_index.product_removed(product_id)
+    search_backend.product_removed(product_id)
 
     return {"status": "success", "message": "Product marked as inactive"}
 
 
 @router.get("/{product_id}/reviews/", response_model=list[ReviewSchema])
 async def get_reviews_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
-    stmt = select(ProductModel).where(ProductModel.id == product_id, ProductModel.is_active == True)
-    product = (await db.scalars(stmt)).first()
-
-    if product is None:
+    if not await product_exists(db, product_id):
         raise HTTPException(status_code=404, detail="Product not found")
 
-    stmt = select(ReviewModel).where(ReviewModel.product_id == product_id, ReviewModel.is_active == True)
-    reviews = (await db.scalars(stmt)).all()
-
-    return reviews
+    reviews = await fetch_product_reviews(db, product_id)
+    return reviews_serializer.response(reviews)
 
 
-async def save_product_image(file: UploadFile) -> str:
+async def save_product_image(db: AsyncSession, file: UploadFile) -> str:
     """
     Сохраняет изображение товара и возвращает относительный URL.
+    Файлы адресуются по sha256 содержимого, дубликаты не пишутся повторно (app/tools/media_store.py).
     """
-    if file.content_type not in ALLOWED_IMAGE_TYPES:
-        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Only JPG, PNG or WebP images are allowed")
-
-    content = await file.read()
-    if len(content) > MAX_IMAGE_SIZE:
-        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Image is too large")
-
-    extension = Path(file.filename or "").suffix.lower() or ".jpg"
-    file_name = f"{uuid.uuid4()}{extension}"
-    file_path = MEDIA_ROOT / file_name
-    file_path.write_bytes(content)
-
-    return f"/media/products/{file_name}"
+    return await store_product_image(db, file)
 
 
-def remove_product_image(url: str | None) -> None:
+async def remove_product_image(db: AsyncSession, url: str | None) -> str | None:
     """
-    Удаляет файл изображения, если он существует.
+    Снимает ссылку на изображение. Возвращает URL файла, на который ссылок не осталось:
+    его удаляет purge_product_image после коммита.
     """
-    if not url:
-        return
-    
-    relative_path = url.lstrip("/")
-    file_path = BASE_DIR / relative_path
-    
-    if file_path.exists():
-        file_path.unlink()
\ No newline at end of file
+    return await release_product_image(db, url)
@@ -10,6 +10,7 @@ from app.models.products import Product as ProductModel
 from app.schemas import Review as ReviewSchema, ReviewCreate
 from app.db_depends import get_async_db
 from app.tools.reviews import update_product_rating
+from app.tools.serialization import FastSerializer
 from sqlalchemy.sql import func
 
 
@@ -18,6 +19,8 @@ router = APIRouter(
     tags=["reviews"],
 )
 
+reviews_serializer = FastSerializer(list[ReviewSchema])
+
 
 @router.get("/", response_model=list[ReviewSchema])
 async def get_reviews(db: AsyncSession = Depends(get_async_db)):
@@ -31,7 +34,7 @@ async def get_reviews(db: AsyncSession = Depends(get_async_db)):
 
     result = await db.scalars(select(ReviewModel).where(ReviewModel.is_active == True))
 
-    return result.all()
+    return reviews_serializer.response(result.all())
 
 
 @router.post("/", response_model=ReviewSchema)
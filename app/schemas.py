@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, computed_field, model_validator
 from decimal import Decimal
 from datetime import datetime
-from typing import Annotated
-from fastapi import Form
+from typing import Annotated, Literal
+from fastapi import Form, Query
+
+from app.tools.images import image_variants
 
 
 class CategoryCreate(BaseModel):
@@ -28,6 +30,18 @@ class Category(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CategoryTreeNode(BaseModel):
+    """
+    Узел дерева категорий для GET /categories/tree.
+    """
+    id: int = Field(..., description="Уникальный идентификатор категории")
+    name: str = Field(..., description="Название категории")
+    parent_id: int | None = Field(None, description="ID родительской категории, если есть")
+    product_count: int = Field(..., description="Активных товаров в самой категории")
+    total_product_count: int = Field(..., description="Активных товаров вместе с подкатегориями")
+    children: list["CategoryTreeNode"] = Field(default_factory=list, description="Подкатегории")
+
+
 # class ProductCreate(BaseModel):
 #     """
 #     Модель для создания и обновления товара.
@@ -110,6 +124,67 @@ class Product(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field(description="Уменьшенные копии изображения: {ширина.формат: URL}; "
+                                "пока копия не готова, по её URL отдаётся оригинал")
+    @property
+    def image_variants(self) -> dict[str, str] | None:
+        return image_variants(self.image_url)
+
+
+class ProductFilter(BaseModel):
+    """
+    Фильтры списка товаров.
+    Общие для /products/2 и потоковой выгрузки каталога.
+    """
+    category_id: int | None = None
+    include_descendants: bool = False
+    search: str | None = None
+    lang: Literal["auto", "russian", "english"] = "auto"
+    min_price: float | None = None
+    max_price: float | None = None
+    in_stock: bool | None = None
+    seller_id: int | None = None
+    created_date: datetime | None = None
+
+    @classmethod
+    def as_query(
+            cls,
+            category_id: Annotated[int | None, Query(description="ID категории для фильтрации")] = None,
+            include_descendants: Annotated[bool, Query(
+                description="Вместе с category_id искать и во всех подкатегориях")] = False,
+            search: Annotated[str | None, Query(min_length=1, description="Поиск по названию товара")] = None,
+            lang: Annotated[Literal["auto", "russian", "english"], Query(
+                description="Язык поиска: auto — русский и английский одновременно")] = "auto",
+            min_price: Annotated[float | None, Query(ge=0, description="Минимальная цена товара")] = None,
+            max_price: Annotated[float | None, Query(ge=0, description="Максимальная цена товара")] = None,
+            in_stock: Annotated[bool | None, Query(
+                description="true — только товары в наличии, false — только без остатка")] = None,
+            seller_id: Annotated[int | None, Query(description="ID продавца для фильтрации")] = None,
+            created_date: Annotated[datetime | None, Query(description="Дата добавления")] = None,
+    ) -> "ProductFilter":
+        return cls(
+            category_id=category_id,
+            include_descendants=include_descendants,
+            search=search,
+            lang=lang,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            seller_id=seller_id,
+            created_date=created_date,
+        )
+
+    @property
+    def search_value(self) -> str:
+        return self.search.strip() if self.search else ""
+
+    def cache_key(self) -> tuple:
+        """
+        Нормализованный кортеж фильтров — ключ для кэшей списков.
+        """
+        return (self.category_id, self.include_descendants, self.search_value.lower(), self.lang, self.min_price, self.max_price,
+                self.in_stock, self.seller_id, self.created_date)
+
 
 class UserCreate(BaseModel):
     email: EmailStr = Field(..., description="Email пользователя")
@@ -149,18 +224,76 @@ class Review(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class FacetValue(BaseModel):
+    """Значение фасета и число товаров с ним."""
+    value: int | bool | str = Field(..., description="ID категории/продавца, ценовая корзина или наличие")
+    count: int = Field(ge=0, description="Количество товаров")
+
+
 class ProductList(BaseModel):
     """
     Список пагинации для товаров.
     """
     items: list[Product] = Field(description="Товары для текущей страницы")
     total: int = Field(ge=0, description="Общее количество товаров")
+    total_exact: bool = Field(True, description="False, если total — оценка планировщика")
     page: int = Field(ge=1, description="Номер текущей страницы")
     page_size: int = Field(ge=1, description="Количество элементов на странице")
+    next_cursor: str | None = Field(None, description="Курсор следующей страницы (None — страниц больше нет)")
+    matcher: Literal["fts", "trigram"] | None = Field(
+        None, description="Каким поиском найдены товары: полнотекстовым или по триграммам")
+    facets: dict[str, list[FacetValue]] | None = Field(
+        None, description="Счётчики фасетов для текущих фильтров (если запрошены через facets=)")
 
     model_config = ConfigDict(from_attributes=True)  # Для чтения из ORM-объектов
 
 
+class BulkRowError(BaseModel):
+    """Ошибка в строке массового импорта."""
+    row: int | None = Field(None, description="Номер строки файла (None — ошибка всего файла)")
+    errors: list[str] = Field(..., description="Описание ошибок")
+
+
+class BulkImportResult(BaseModel):
+    """Итог массового импорта товаров."""
+    created: int = Field(ge=0, description="Сколько товаров создано")
+    failed: int = Field(ge=0, description="Сколько строк отклонено")
+    errors: list[BulkRowError] = Field(default_factory=list, description="Отчёт по отклонённым строкам")
+
+
+class ProductBulkUpdateItem(BaseModel):
+    """Изменение цены и/или остатка одного товара."""
+    id: int = Field(..., description="ID товара")
+    price: Decimal | None = Field(None, gt=0, decimal_places=2, description="Новая цена")
+    stock: int | None = Field(None, ge=0, description="Новый остаток")
+
+    @model_validator(mode="after")
+    def check_changes(self) -> "ProductBulkUpdateItem":
+        if self.price is None and self.stock is None:
+            raise ValueError("price or stock must be set")
+        return self
+
+
+class ProductBulkUpdateResult(BaseModel):
+    """Итог массового обновления цен и остатков."""
+    applied: list[int] = Field(default_factory=list, description="ID обновлённых товаров")
+    rejected: list[int] = Field(default_factory=list,
+                                description="ID товаров, которые не найдены, неактивны или принадлежат другому продавцу")
+
+
+class Suggestion(BaseModel):
+    """Подсказка поиска."""
+    id: int = Field(..., description="ID товара или категории")
+    name: str = Field(..., description="Название")
+    score: float = Field(..., description="Вес: рейтинг товара или число товаров в категории")
+
+
+class Suggestions(BaseModel):
+    """Подсказки для поиска по мере набора."""
+    products: list[Suggestion] = Field(default_factory=list, description="Товары")
+    categories: list[Suggestion] = Field(default_factory=list, description="Категории")
+
+
 class CartItemBase(BaseModel):
     product_id: int = Field(description="ID товара")
     quantity: int = Field(ge=1, description="Количество товара")
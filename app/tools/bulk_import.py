@@ -0,0 +1,94 @@
+import codecs
+import csv
+import json
+from collections.abc import Iterator
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Literal
+
+from fastapi import HTTPException, UploadFile, status
+
+
+ImportFormat = Literal["csv", "ndjson"]
+
+PRODUCT_IMPORT_FIELDS = ("name", "description", "price", "stock", "category_id")
+
+
+def detect_format(file: UploadFile, fmt: ImportFormat | None) -> ImportFormat:
+    """
+    Формат выгрузки: явный параметр, затем расширение файла, затем content-type.
+    """
+    if fmt is not None:
+        return fmt
+    suffix = Path(file.filename or "").suffix.lower()
+    content_type = (file.content_type or "").split(";")[0].strip()
+    if suffix == ".csv" or content_type in {"text/csv", "application/csv"}:
+        return "csv"
+    if suffix in {".ndjson", ".jsonl"} or content_type in {"application/x-ndjson", "application/jsonl"}:
+        return "ndjson"
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Unknown import format, pass format=csv or format=ndjson",
+    )
+
+
+def _decode_lines(stream: BinaryIO) -> Iterator[str]:
+    """
+    Декодирует файл построчно: ошибка UTF-8 всплывает на своей строке,
+    а не на блоке, прочитанном декодером наперёд, — строки до неё успевают разобраться.
+    """
+    for number, raw in enumerate(stream):
+        if number == 0:
+            raw = raw.removeprefix(codecs.BOM_UTF8)
+        yield raw.decode("utf-8")
+
+
+def iter_upload_rows(stream: BinaryIO, fmt: ImportFormat) -> Iterator[tuple[int, dict | str]]:
+    """
+    Построчно читает загруженный файл (UploadFile.file уже лежит в spooled temp file)
+    и отдаёт (номер строки, словарь полей) или (номер строки, текст ошибки разбора).
+    Файл целиком в память не читается. Функция синхронная — вызывать из threadpool.
+    """
+    stream.seek(0)
+    lines = _decode_lines(stream)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        missing = {"name", "price", "stock", "category_id"} - set(reader.fieldnames or ())
+        if missing:
+            yield 1, f"Missing CSV columns: {', '.join(sorted(missing))}"
+            return
+        # строка 1 — заголовок
+        for row in reader:
+            data = {key: value for key, value in row.items() if key in PRODUCT_IMPORT_FIELDS}
+            if data.get("description") == "":
+                data["description"] = None
+            yield reader.line_num, data
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, f"Invalid JSON: {exc.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, "Row must be a JSON object"
+            continue
+        yield line_number, data
+
+
+def read_batch(rows: Iterator[tuple[int, dict | str]], size: int) -> tuple[list[tuple[int, dict | str]], str | None]:
+    """
+    До size строк из iter_upload_rows и текст ошибки, если файл дальше не разобрать
+    (битый UTF-8, сломанный CSV). Строки, прочитанные до ошибки, не теряются.
+    Функция синхронная — вызывать из threadpool.
+    """
+    batch = []
+    try:
+        for row in islice(rows, size):
+            batch.append(row)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        return batch, f"File parsing stopped: {exc}"
+    return batch, None
@@ -0,0 +1,193 @@
+import json
+import time
+
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.categories import Category as CategoryModel
+from app.models.data_versions import DataVersion as DataVersionModel
+from app.models.products import Product as ProductModel
+from app.tools.http_cache import make_etag
+
+
+# Как часто проверять версию справочника в БД: изменения из других воркеров
+# становятся видны не позже чем через этот интервал
+TREE_REFRESH_INTERVAL = 30.0
+
+
+async def categories_version(db: AsyncSession) -> str | None:
+    """
+    Версия справочника категорий — md5 от содержимого таблицы, считается на стороне БД.
+    Таблица маленькая, а у категорий нет updated_at.
+    """
+    row = func.concat_ws(":", CategoryModel.id, CategoryModel.name,
+                         CategoryModel.parent_id, CategoryModel.is_active)
+    return await db.scalar(
+        select(func.md5(func.string_agg(row, aggregate_order_by(literal_column("','"), CategoryModel.id))))
+    )
+
+
+async def products_version(db: AsyncSession) -> int | None:
+    """
+    Версия каталога товаров из data_versions: растёт при коммите каждой транзакции, изменившей products.
+    """
+    return await db.scalar(select(DataVersionModel.version).where(DataVersionModel.name == "products"))
+
+
+async def _active_product_counts(db: AsyncSession) -> dict[int, int]:
+    rows = await db.execute(
+        select(ProductModel.category_id, func.count())
+        .where(ProductModel.is_active == True)
+        .group_by(ProductModel.category_id)
+    )
+    return dict(rows.all())
+
+
+class CategoryTree:
+    """
+    Дерево активных категорий в памяти с заранее посчитанными поддеревьями
+    и готовым JSON для GET /categories/tree.
+    Две независимые части:
+    - структура (поддеревья для фильтра include_descendants) зависит только от справочника категорий:
+      перестраивается после записи категорий в этом процессе и при смене categories_version;
+    - JSON дерева со счётчиками товаров — только для /categories/tree: счётчики агрегируются заново,
+      только когда сменилась структура или версия каталога товаров (products_version).
+    Версии из других воркеров проверяются не чаще раза в TREE_REFRESH_INTERVAL,
+    после записи в этом процессе (invalidate, invalidate_counts) — при следующем обращении.
+    """
+
+    def __init__(self):
+        self.version: str | None = None
+        self.etag: str | None = None
+        self.json: bytes = b"[]"
+        self._active: dict[int, tuple[str, int | None]] = {}
+        self._children: dict[int | None, list[int]] = {}
+        self._subtrees: dict[int, list[int]] = {}
+        self._checked_at = 0.0
+        self._stale = True
+        self._counts: dict[int, int] | None = None
+        self._products_version: int | None = None
+        self._counts_checked_at = 0.0
+        self._counts_stale = True
+
+    async def build(self, db: AsyncSession) -> None:
+        """
+        Полная сборка при старте: структура и JSON со счётчиками.
+        """
+        await self._build_structure(db)
+        await self._render(db)
+
+    async def _build_structure(self, db: AsyncSession) -> None:
+        version = await categories_version(db)
+        rows = (await db.execute(
+            select(CategoryModel.id, CategoryModel.name, CategoryModel.parent_id)
+            .where(CategoryModel.is_active == True)
+            .order_by(CategoryModel.id)
+        )).all()
+
+        children: dict[int | None, list[int]] = {}
+        active = {category_id: (name, parent_id) for category_id, name, parent_id in rows}
+        for category_id, _, parent_id in rows:
+            # потомки неактивной категории в дерево не попадают
+            if parent_id is not None and parent_id not in active:
+                continue
+            children.setdefault(parent_id, []).append(category_id)
+
+        subtrees: dict[int, list[int]] = {}
+        for category_id in active:
+            ids, stack, seen = [], [category_id], set()
+            while stack:
+                node = stack.pop()
+                if node in seen:  # защита от циклов parent_id
+                    continue
+                seen.add(node)
+                ids.append(node)
+                stack.extend(children.get(node, ()))
+            subtrees[category_id] = ids
+
+        self._active, self._children, self._subtrees = active, children, subtrees
+        self.version = version
+        self._checked_at = time.monotonic()
+        self._stale = False
+        # JSON описывает прежнюю структуру
+        self._counts = None
+
+    async def _render(self, db: AsyncSession) -> None:
+        # версию читаем до счётчиков: коммит между ними даст лишнюю перерисовку, а не устаревший JSON
+        version = await products_version(db)
+        self._counts_checked_at = time.monotonic()
+        self._counts_stale = False
+        if self._counts is not None and version == self._products_version:
+            return
+        counts = await _active_product_counts(db)
+        self._products_version = version
+        if counts == self._counts:
+            # сменились цены или остатки — JSON тот же
+            return
+        active, children, subtrees = self._active, self._children, self._subtrees
+
+        def make_node(category_id: int) -> dict:
+            name, parent_id = active[category_id]
+            return {
+                "id": category_id,
+                "name": name,
+                "parent_id": parent_id,
+                "product_count": counts.get(category_id, 0),
+                "total_product_count": sum(counts.get(node, 0) for node in subtrees[category_id]),
+                "children": [make_node(child) for child in children.get(category_id, ())],
+            }
+
+        # узлы из циклов parent_id недостижимы от корней и в JSON не попадают
+        tree = [make_node(category_id) for category_id in children.get(None, ())]
+        self.json = json.dumps(tree, ensure_ascii=False, separators=(",", ":")).encode()
+        self._counts = counts
+        # одинаковый во всех воркерах при одинаковых данных
+        self.etag = make_etag("category-tree", self.version, sorted(counts.items()))
+
+    def invalidate(self) -> None:
+        """
+        Вызывается после коммита записи категорий: следующее обращение перестроит дерево.
+        """
+        self._stale = True
+
+    def invalidate_counts(self) -> None:
+        """
+        Вызывается после коммита записи товаров (создание, удаление, смена категории):
+        следующее обращение к /categories/tree сверит версию каталога, поддеревья не трогаются.
+        """
+        self._counts_stale = True
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """
+        Актуальная структура; дешёвая проверка — md5 по маленькой таблице категорий.
+        """
+        if self._stale:
+            await self._build_structure(db)
+        elif time.monotonic() - self._checked_at > TREE_REFRESH_INTERVAL:
+            # изменения справочника из других воркеров
+            if await categories_version(db) != self.version:
+                await self._build_structure(db)
+            else:
+                self._checked_at = time.monotonic()
+
+    async def serialized(self, db: AsyncSession) -> tuple[bytes, str]:
+        """
+        Готовый JSON дерева и его ETag; байты переиспользуются между запросами.
+        Опрос раз в TREE_REFRESH_INTERVAL — чтение одной строки версии, счётчики не агрегируются.
+        """
+        await self.ensure_fresh(db)
+        if (self._counts is None or self._counts_stale
+                or time.monotonic() - self._counts_checked_at > TREE_REFRESH_INTERVAL):
+            await self._render(db)
+        return self.json, self.etag
+
+    async def subtree_ids(self, db: AsyncSession, category_id: int) -> list[int]:
+        """
+        ID категории и всех её активных потомков. Счётчики товаров не нужны и не пересчитываются.
+        """
+        await self.ensure_fresh(db)
+        return self._subtrees.get(category_id, [category_id])
+
+
+category_tree = CategoryTree()
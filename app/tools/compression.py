@@ -0,0 +1,216 @@
+import gzip
+import zlib
+from collections.abc import Callable
+
+try:
+    import brotli
+except ImportError:  # brotli и zstandard необязательны: без них остаётся gzip
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.tools.cache import LRUTTLCache
+
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # выше 5 brotli резко дорожает, а выигрыш на JSON — единицы процентов
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript",
+                      "application/xml", "image/svg+xml")
+CACHE_MAX_BODY = 1024 * 1024  # больше не кэшируем: кэш ограничен числом записей, а не байтами
+THREADPOOL_MIN_BODY = 64 * 1024  # крупные тела сжимаются в threadpool (zlib, brotli, zstd отпускают GIL)
+
+# Сжатые тела популярных ответов: ключ — (путь, ETag, кодировка).
+# ETag меняется вместе с данными, так что устаревшая запись просто перестаёт запрашиваться
+compressed_cache = LRUTTLCache(maxsize=256, ttl=600.0)
+
+
+class _GzipStream:
+    def __init__(self):
+        self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 — формат gzip
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdStream:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+# кодировка -> (сжатие тела целиком, потоковый компрессор); порядок — предпочтение сервера
+CODECS: dict[str, tuple[Callable[[bytes], bytes], type]] = {}
+if zstandard is not None:
+    CODECS["zstd"] = (lambda body: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), _ZstdStream)
+if brotli is not None:
+    CODECS["br"] = (lambda body: brotli.compress(body, quality=BROTLI_QUALITY), _BrotliStream)
+CODECS["gzip"] = (lambda body: gzip.compress(body, GZIP_LEVEL, mtime=0), _GzipStream)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    Кодировка из Accept-Encoding с наибольшим q; при равных q — в порядке CODECS.
+    None — сжимать нельзя или клиент не умеет.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, *params = item.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in CODECS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def no_compression(endpoint):
+    """
+    Отключает сжатие ответов эндпоинта. Ставится под декоратором маршрута.
+    """
+    endpoint.no_compression = True
+    return endpoint
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы gzip / brotli / zstd по Accept-Encoding.
+    Не трогает: несжимаемые типы (изображения), уже сжатые ответы, 206, тела меньше minimum_size
+    и маршруты с @no_compression. Потоковые ответы сжимаются по мере отдачи, с flush на каждом куске.
+    Сжатые тела ответов с ETag кэшируются в compressed_cache.
+    Сильный ETag при сжатии становится слабым: байты другие, а If-None-Match эндпоинтов сравнивает слабо.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _CompressionResponder(scope, send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, scope: Scope, send: Send, encoding: str | None, minimum_size: int):
+        self.scope = scope
+        self.inner_send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Message | None = None
+        self.stream = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # заголовки отправим вместе с первым куском тела, когда станет ясно, сжимать ли
+            self.start = message
+            return
+        if self.start is None:
+            if self.stream is not None and message["type"] == "http.response.body":
+                body = self.stream.compress(message.get("body", b""))
+                if not message.get("more_body", False):
+                    body += self.stream.finish()
+                message = {**message, "body": body}
+            await self.inner_send(message)
+            return
+
+        start, self.start = self.start, None
+        if message["type"] != "http.response.body":
+            # например http.response.pathsend у FileResponse
+            await self.inner_send(start)
+            await self.inner_send(message)
+            return
+
+        headers = MutableHeaders(raw=start["headers"])
+        if not self._compressible(start["status"], headers):
+            await self.inner_send(start)
+            await self.inner_send(message)
+            return
+
+        headers.add_vary_header("Accept-Encoding")
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoding is None or (not more_body and len(body) < self.minimum_size):
+            await self.inner_send(start)
+            await self.inner_send(message)
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+        if more_body:
+            if "content-length" in headers:
+                del headers["content-length"]
+            self.stream = CODECS[self.encoding][1]()
+            await self.inner_send(start)
+            await self.inner_send({**message, "body": self.stream.compress(body)})
+            return
+
+        compressed = await self._compress(body, etag)
+        headers["Content-Length"] = str(len(compressed))
+        await self.inner_send(start)
+        await self.inner_send({**message, "body": compressed})
+
+    def _compressible(self, status: int, headers: MutableHeaders) -> bool:
+        if status < 200 or status in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        endpoint = getattr(self.scope.get("route"), "endpoint", None)
+        if getattr(endpoint, "no_compression", False):
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def _compress(self, body: bytes, etag: str | None) -> bytes:
+        key = (self.scope["path"], etag, self.encoding) if etag and len(body) <= CACHE_MAX_BODY else None
+        if key is not None:
+            cached = compressed_cache.get(key)
+            if cached is not None:
+                return cached
+        compress = CODECS[self.encoding][0]
+        if len(body) >= THREADPOOL_MIN_BODY:
+            compressed = await run_in_threadpool(compress, body)
+        else:
+            compressed = compress(body)
+        if key is not None:
+            compressed_cache.set(key, compressed)
+        return compressed
@@ -0,0 +1,43 @@
+import json
+from enum import Enum
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.tools.cache import LRUTTLCache
+
+
+class CountMode(str, Enum):
+    """
+    Способ подсчёта total для списков товаров.
+    exact — точный count(*) OVER () в том же запросе, что и страница;
+    cached — точное значение из кэша по набору фильтров (с TTL);
+    estimated — оценка планировщика, только для списка без фильтров.
+    """
+    exact = "exact"
+    cached = "cached"
+    estimated = "estimated"
+
+
+# total по нормализованному кортежу фильтров; сбрасывается целиком при записи в products
+product_count_cache = LRUTTLCache(maxsize=1024, ttl=30.0)
+
+
+def invalidate_product_counts() -> None:
+    """
+    Вызывается после коммита любой записи, меняющей состав или остатки товаров.
+    """
+    product_count_cache.clear()
+
+
+async def estimate_active_products(db: AsyncSession) -> int:
+    """
+    Оценка числа активных товаров по статистике планировщика, без скана таблицы.
+    """
+    result = await db.execute(
+        text("EXPLAIN (FORMAT JSON) SELECT 1 FROM products WHERE is_active = true")
+    )
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,72 @@
+from fastapi import HTTPException, status
+from sqlalchemy import select, func, case, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.products import Product as ProductModel
+
+
+# Границы ценовых корзин: [0, 500), [500, 1000), ... , [10000, +inf)
+PRICE_FACET_BUCKETS = (0, 500, 1000, 5000, 10000)
+
+
+# Константы подставляются литералами: выражение в SELECT и в GROUPING SETS
+# должно совпадать текстуально, а разные bind-параметры Postgres считает разными
+def _price_bucket():
+    bounds = PRICE_FACET_BUCKETS
+    whens = [
+        (ProductModel.price < literal_column(str(upper)), literal_column(f"'{lower}-{upper}'"))
+        for lower, upper in zip(bounds, bounds[1:])
+    ]
+    return case(*whens, else_=literal_column(f"'{bounds[-1]}+'"))
+
+
+# имя фасета -> выражение группировки
+FACETS = {
+    "category": lambda: ProductModel.category_id,
+    "seller": lambda: ProductModel.seller_id,
+    "price": _price_bucket,
+    "stock": lambda: ProductModel.stock > literal_column("0"),
+}
+
+
+def parse_facets(value: str | None) -> list[str]:
+    """
+    Разбирает параметр facets=category,price,... и проверяет имена.
+    """
+    if not value:
+        return []
+    names = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown facets: {', '.join(unknown)}. Allowed: {', '.join(FACETS)}",
+        )
+    return names
+
+
+async def load_facets(db: AsyncSession, filters: list, names: list[str]) -> dict[str, list[dict]]:
+    """
+    Считает все запрошенные фасеты одним запросом GROUP BY GROUPING SETS
+    по тем же условиям, что и страница товаров.
+    """
+    columns = [FACETS[name]().label(name) for name in names]
+    stmt = (
+        select(
+            *columns,
+            *[func.grouping(column.element).label(f"g_{column.name}") for column in columns],
+            func.count().label("count"),
+        )
+        .where(*filters)
+        .group_by(func.grouping_sets(*[column.element for column in columns]))
+    )
+    facets: dict[str, list[dict]] = {name: [] for name in names}
+    for row in (await db.execute(stmt)).mappings():
+        for name in names:
+            # grouping() = 0 у колонки, по которой сгруппирована строка
+            if row[f"g_{name}"] == 0:
+                facets[name].append({"value": row[name], "count": row["count"]})
+                break
+    for values in facets.values():
+        values.sort(key=lambda item: item["count"], reverse=True)
+    return facets
@@ -0,0 +1,77 @@
+from functools import lru_cache
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+from app.models.products import Product as ProductModel
+from app.schemas import Product as ProductSchema, ProductList
+
+
+# Поля ответа в порядке схемы Product; tsv в ответ не входит и никогда не выбирается
+PRODUCT_FIELDS = tuple(ProductSchema.model_fields)
+
+
+def parse_fields(value: str | None) -> tuple[str, ...] | None:
+    """
+    Разбирает параметр fields=id,name,price,... и проверяет имена.
+    id добавляется всегда (нужен для курсора и ETag). None — отдавать все поля.
+    Порядок приводится к порядку схемы, чтобы одинаковые наборы давали одну модель.
+    """
+    if not value:
+        return None
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = sorted(names - set(PRODUCT_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(PRODUCT_FIELDS)}",
+        )
+    names.add("id")
+    return tuple(name for name in PRODUCT_FIELDS if name in names)
+
+
+def product_columns(fields: tuple[str, ...]) -> list:
+    """
+    Колонки products для SELECT — только запрошенные поля.
+    """
+    return [getattr(ProductModel, name) for name in fields]
+
+
+@lru_cache(maxsize=256)
+def product_fields_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    """
+    Схема товара только с выбранными полями; описания и ограничения берутся из Product.
+    Читает и ORM-объекты, и строки SELECT по колонкам.
+    """
+    return create_model(
+        "ProductFields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (ProductSchema.model_fields[name].annotation, ProductSchema.model_fields[name])
+           for name in fields},
+    )
+
+
+@lru_cache(maxsize=256)
+def product_list_fields_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    """
+    ProductList, у которого items — товары только с выбранными полями.
+    """
+    return create_model(
+        "ProductListFields",
+        __base__=ProductList,
+        items=(list[product_fields_model(fields)], ProductList.model_fields["items"]),
+    )
+
+
+@lru_cache(maxsize=256)
+def _product_list_adapter(fields: tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(list[product_fields_model(fields)])
+
+
+def dump_products(fields: tuple[str, ...], rows) -> bytes:
+    """
+    JSON-массив товаров только с выбранными полями.
+    """
+    adapter = _product_list_adapter(fields)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow необязателен: без него отдаются только оригиналы
+    Image = None
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import IMAGE_WORKERS
+from app.tools.media import media_path
+
+
+logger = logging.getLogger(__name__)
+
+# Ширины производных изображений и их форматы; больше оригинала не увеличиваем
+IMAGE_VARIANT_WIDTHS = (200, 400, 800)
+IMAGE_VARIANT_FORMATS = {".webp": ("WEBP", {"quality": 80, "method": 4}),
+                         ".jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True})}
+_VARIANT_KEYS = tuple(f"{width}{extension}" for width in IMAGE_VARIANT_WIDTHS for extension in IMAGE_VARIANT_FORMATS)
+
+_pool: ProcessPoolExecutor | None = None
+_pending: set[Future] = set()
+
+
+def variant_path(original: Path, width: int, extension: str) -> Path:
+    return original.with_name(f"{original.stem}_{width}{extension}")
+
+
+def encoded_path(original: Path, extension: str) -> Path:
+    """
+    Полноразмерная копия в другом формате: <имя оригинала><extension>, например abc.jpg.webp.
+    Её отдаёт вместо оригинала media_server, если клиент принимает этот формат.
+    """
+    return original.with_name(original.name + extension)
+
+
+def variant_files(original: Path) -> list[Path]:
+    """
+    Все производные файлы оригинала (для удаления вместе с ним).
+    """
+    paths = [variant_path(original, width, extension)
+             for width in IMAGE_VARIANT_WIDTHS for extension in IMAGE_VARIANT_FORMATS]
+    paths.append(encoded_path(original, ".webp"))
+    return paths
+
+
+def generate_variants(source: str) -> list[str]:
+    """
+    Пишет уменьшенные копии source для всех IMAGE_VARIANT_WIDTHS и форматов.
+    Выполняется в отдельном процессе: декодирование и ресайз держат GIL.
+    Для JPEG и PNG пишется ещё полноразмерная WebP-копия (encoded_path).
+    Каждый файл пишется во временный и переименовывается, так что недописанных копий не видно.
+    """
+    original = Path(source)
+    created = []
+    with Image.open(original) as image:
+        image.load()
+        has_alpha = image.mode in ("RGBA", "LA", "P")
+        if image.format != "WEBP":
+            target = encoded_path(original, ".webp")
+            fmt, options = IMAGE_VARIANT_FORMATS[".webp"]
+            tmp = target.with_name(f".{target.name}.tmp")
+            image.convert("RGBA" if has_alpha else "RGB").save(tmp, fmt, **options)
+            os.replace(tmp, target)
+            created.append(str(target))
+        for width in IMAGE_VARIANT_WIDTHS:
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            resized = image.convert("RGBA" if has_alpha else "RGB").resize((width, height), Image.LANCZOS)
+            for extension, (fmt, options) in IMAGE_VARIANT_FORMATS.items():
+                target = variant_path(original, width, extension)
+                frame = resized
+                if fmt == "JPEG" and has_alpha:
+                    # у JPEG нет прозрачности — кладём на белый фон
+                    frame = Image.new("RGB", resized.size, "white")
+                    frame.paste(resized, mask=resized.getchannel("A"))
+                tmp = target.with_name(f".{target.name}.tmp")
+                frame.save(tmp, fmt, **options)
+                os.replace(tmp, target)
+                created.append(str(target))
+    return created
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: не форкаем процесс с event loop и открытыми соединениями
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _on_done(future: Future) -> None:
+    _pending.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Image variants failed", exc_info=future.exception())
+
+
+def schedule_variants(url: str) -> None:
+    """
+    Ставит генерацию производных в пул процессов и сразу возвращается.
+    Пока копии не готовы, по их URL media_server отдаёт оригинал.
+    """
+    path = media_path(url)
+    if Image is None or path is None:
+        return
+    future = asyncio.get_running_loop().run_in_executor(_get_pool(), generate_variants, str(path))
+    _pending.add(future)
+    future.add_done_callback(_on_done)
+
+
+def shutdown_image_pool() -> None:
+    """
+    Дожидается начатых генераций и останавливает пул (при остановке приложения).
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+def _remove_variant_files(original: Path) -> None:
+    for path in variant_files(original):
+        path.unlink(missing_ok=True)
+
+
+async def remove_variants(url: str | None) -> None:
+    """
+    Удаляет производные изображения вместе с оригиналом.
+    """
+    original = media_path(url) if url else None
+    if original is not None:
+        await run_in_threadpool(_remove_variant_files, original)
+
+
+def image_variants(url: str | None) -> dict[str, str] | None:
+    """
+    URL производных вида {"200.webp": ..., "200.jpg": ...}.
+    URL не зависят от того, готова ли копия: к диску не обращаемся (вызывается при сериализации
+    каждого товара), и ETag ответа не устаревает, когда копии появляются. Пока копии нет
+    (или она не нужна — шире оригинала), media_server отдаёт по её URL оригинал.
+    """
+    if not url:
+        return None
+    if Image is None or not url.startswith("/media/"):
+        # копии не делаются вовсе
+        return {key: url for key in _VARIANT_KEYS}
+    # строковые операции: PurePosixPath на каждый товар заметно дороже
+    directory, _, name = url.rpartition("/")
+    stem = name.rpartition(".")[0] or name
+    base = f"{directory}/{stem}_"
+    # ключ "200.webp" совпадает с хвостом имени копии <stem>_200.webp
+    return {key: base + key for key in _VARIANT_KEYS}
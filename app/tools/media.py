@@ -0,0 +1,135 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+MEDIA_DIR = BASE_DIR / "media"
+PRODUCT_MEDIA_ROOT = MEDIA_DIR / "products"
+PRODUCT_MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
+
+MAX_IMAGE_SIZE = 2 * 1024 * 1024  # 2 097 152 байт
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def sniff_image(head: bytes) -> str | None:
+    """
+    Определяет формат по сигнатуре файла, а не по content-type от клиента.
+    Возвращает расширение или None.
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def _bad_image(detail: str) -> HTTPException:
+    return HTTPException(status.HTTP_400_BAD_REQUEST, detail)
+
+
+@dataclass
+class ReceivedImage:
+    """
+    Загрузка во временном файле: ещё не лежит по своему адресу в хранилище.
+    """
+    tmp_path: Path
+    digest: str
+    extension: str
+    size: int
+
+    @property
+    def relative_path(self) -> str:
+        # sha256 с шардированием по каталогам, чтобы в одном каталоге не было миллионов файлов
+        return f"{self.digest[:2]}/{self.digest[2:4]}/{self.digest}{self.extension}"
+
+
+def _receive_image(source: BinaryIO, directory: Path, max_size: int) -> ReceivedImage:
+    """
+    Копирует загрузку кусками во временный файл в directory, попутно считая sha256.
+    Прерывается, как только размер превысил max_size. Синхронная — вызывать из threadpool.
+    """
+    source.seek(0)
+    head = source.read(UPLOAD_CHUNK_SIZE)
+    extension = sniff_image(head)
+    if extension is None:
+        raise _bad_image("Only JPG, PNG or WebP images are allowed")
+
+    digest = hashlib.sha256()
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            size = 0
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_size:
+                    raise _bad_image("Image is too large")
+                digest.update(chunk)
+                tmp.write(chunk)
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return ReceivedImage(Path(tmp_name), digest.hexdigest(), extension, size)
+
+
+async def receive_image(
+        file: UploadFile, directory: Path = PRODUCT_MEDIA_ROOT, max_size: int = MAX_IMAGE_SIZE,
+) -> ReceivedImage:
+    """
+    Принимает загруженное изображение во временный файл.
+    Вся работа с диском — в threadpool, event loop не блокируется.
+    """
+    # размер известен из multipart — слишком большой файл отклоняем, не читая
+    if file.size is not None and file.size > max_size:
+        raise _bad_image("Image is too large")
+    return await run_in_threadpool(_receive_image, file.file, directory, max_size)
+
+
+def place_image(image: ReceivedImage, directory: Path = PRODUCT_MEDIA_ROOT) -> bool:
+    """
+    Переносит временный файл по его адресу атомарным rename.
+    Если такой файл уже есть (дубликат), временный удаляется. True — файл новый.
+    """
+    target = directory / image.relative_path
+    if target.exists():
+        image.tmp_path.unlink(missing_ok=True)
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(image.tmp_path, target)
+    return True
+
+
+def discard_image(image: ReceivedImage) -> None:
+    image.tmp_path.unlink(missing_ok=True)
+
+
+def media_path(url: str) -> Path | None:
+    """
+    Путь к файлу по URL вида /media/...; None, если URL ведёт за пределы MEDIA_DIR.
+    Проверка строковая, без обращений к диску — вызывается при сериализации каждого товара.
+    """
+    relative = PurePosixPath(url.lstrip("/"))
+    if relative.parts[:1] != (MEDIA_DIR.name,) or ".." in relative.parts:
+        return None
+    return BASE_DIR / relative
+
+
+async def remove_media(url: str | None) -> None:
+    """
+    Удаляет файл по URL, если он существует.
+    """
+    if not url:
+        return
+    path = media_path(url)
+    if path is not None:
+        await run_in_threadpool(path.unlink, missing_ok=True)
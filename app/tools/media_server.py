@@ -0,0 +1,167 @@
+import errno
+import mimetypes
+import re
+import stat
+from pathlib import PurePosixPath
+from urllib.parse import quote
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.tools.images import IMAGE_VARIANT_WIDTHS
+
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# файлы старой схемы (uuid-имена) не перезаписываются, но могут быть удалены
+MUTABLE_CACHE_CONTROL = "public, max-age=3600"
+
+# <sha256>.jpg, <sha256>_400.webp, <sha256>.jpg.webp — имя однозначно задаётся содержимым оригинала
+CONTENT_NAME_RE = re.compile(r"^([0-9a-f]{64})((?:_\d+)?\.\w+(?:\.\w+)?)$")
+
+# Пока уменьшенная копия не готова (или не нужна), по её URL отдаётся оригинал — недолго кешируемый:
+# URL копий детерминированы (images.image_variants), сама копия появится позже
+FALLBACK_CACHE_CONTROL = "public, max-age=300"
+VARIANT_NAME_RE = re.compile(r"^(.+)_(\d+)\.\w+$")
+ORIGINAL_EXTENSIONS = (".jpg", ".png", ".webp", ".jpeg")
+
+# Полноразмерные копии в других форматах (app/tools/images.py: encoded_path): расширение оригинала ->
+# [(media type в Accept, суффикс файла)] в порядке предпочтения
+PRE_ENCODED = {
+    ".jpg": [("image/webp", ".webp")],
+    ".jpeg": [("image/webp", ".webp")],
+    ".png": [("image/webp", ".webp")],
+}
+
+
+def _accepts(accept: str, media_type: str) -> bool:
+    """
+    Клиент явно перечислил media_type в Accept с q > 0. */* и image/* не считаются:
+    их шлют и клиенты, которые формат не поддерживают.
+    """
+    for item in accept.split(","):
+        name, *params = item.split(";")
+        if name.strip().lower() != media_type:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+class MediaFileResponse(FileResponse):
+    # без sendfile файл читается кусками; крупнее кусок — меньше итераций на файл
+    chunk_size = 256 * 1024
+
+
+class MediaFiles(StaticFiles):
+    """
+    Раздача /media:
+    - файлы с контентными именами кешируются навсегда (immutable), остальные — на час;
+    - сильный ETag: для контентных имён — сам sha256, иначе mtime и размер;
+    - Range, If-Range и условные запросы — через FileResponse; при поддержке сервером
+      расширения http.response.pathsend файл отправляется sendfile'ом, без чтения в Python;
+    - accel_redirect: тело отдаёт nginx по X-Accel-Redirect, приложение только выбирает файл и заголовки;
+    - negotiate: вместо JPEG/PNG отдаётся готовая WebP-копия, если клиент её принимает (Vary: Accept);
+    - по URL ещё не готовой уменьшенной копии отдаётся оригинал с коротким кешем.
+    """
+
+    def __init__(self, *, directory, negotiate: bool = True, accel_redirect: str | None = None):
+        super().__init__(directory=directory)
+        self.negotiate = negotiate
+        self.accel_redirect = accel_redirect.rstrip("/") + "/" if accel_redirect else None
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        request_headers = Headers(scope=scope)
+
+        accept = request_headers.get("accept", "")
+        candidates, negotiated = self._candidates(path, accept)
+        found = await run_in_threadpool(self._lookup_first, candidates)
+        fallback = False
+        if found is None:
+            originals = self._variant_originals(path)
+            if originals:
+                fallback = True
+                candidates = []
+                for original in originals:
+                    more, original_negotiated = self._candidates(original, accept)
+                    candidates += more
+                    negotiated |= original_negotiated
+                found = await run_in_threadpool(self._lookup_first, candidates)
+        if found is None:
+            raise HTTPException(status_code=404)
+        relative, full_path, stat_result = found
+
+        headers = self._cache_headers(relative, stat_result)
+        if fallback:
+            headers["Cache-Control"] = FALLBACK_CACHE_CONTROL
+        if negotiated:
+            headers["Vary"] = "Accept"
+        if self.accel_redirect is not None:
+            return self._accel_response(relative, headers)
+
+        response = MediaFileResponse(full_path, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _candidates(self, path: str, accept: str) -> tuple[list[str], bool]:
+        """
+        Файлы, которыми можно ответить на path, в порядке предпочтения, и зависит ли выбор от Accept.
+        """
+        alternatives = PRE_ENCODED.get(PurePosixPath(path).suffix.lower(), []) if self.negotiate else []
+        candidates = [path + suffix for media_type, suffix in alternatives if _accepts(accept, media_type)]
+        candidates.append(path)
+        return candidates, bool(alternatives)
+
+    @staticmethod
+    def _variant_originals(path: str) -> list[str]:
+        """
+        Возможные пути оригинала для URL уменьшенной копии <имя>_<ширина>.<формат>.
+        """
+        name = PurePosixPath(path)
+        match = VARIANT_NAME_RE.match(name.name)
+        if match is None or int(match[2]) not in IMAGE_VARIANT_WIDTHS:
+            return []
+        return [str(name.with_name(match[1] + extension)) for extension in ORIGINAL_EXTENSIONS]
+
+    def _lookup_first(self, candidates: list[str]) -> tuple[str, str, object] | None:
+        """
+        Первый существующий обычный файл из candidates. Выполняется в threadpool.
+        """
+        for relative in candidates:
+            try:
+                full_path, stat_result = self.lookup_path(relative)
+            except OSError as exc:
+                # слишком длинное имя — такого файла быть не может
+                if exc.errno == errno.ENAMETOOLONG:
+                    continue
+                raise
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                return relative, full_path, stat_result
+        return None
+
+    @staticmethod
+    def _cache_headers(relative: str, stat_result) -> dict[str, str]:
+        match = CONTENT_NAME_RE.match(PurePosixPath(relative).name)
+        if match is not None:
+            return {"ETag": f'"{match[1]}{match[2]}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        return {"ETag": f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+                "Cache-Control": MUTABLE_CACHE_CONTROL}
+
+    def _accel_response(self, relative: str, headers: dict[str, str]) -> Response:
+        # Тело, Range, условные запросы и ETag (mtime-размер, тоже сильный) — на стороне nginx,
+        # из этого ответа при X-Accel-Redirect он сохраняет Cache-Control
+        headers.pop("ETag")
+        headers["X-Accel-Redirect"] = self.accel_redirect + quote(relative.lstrip("/"))
+        return Response(headers=headers, media_type=mimetypes.guess_type(relative)[0])
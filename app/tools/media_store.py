@@ -0,0 +1,104 @@
+import re
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.media_files import MediaFile as MediaFileModel
+from app.tools.images import schedule_variants, remove_variants
+from app.tools.media import PRODUCT_MEDIA_ROOT, receive_image, place_image, discard_image, remove_media
+
+
+PRODUCT_MEDIA_URL = "/media/products/"
+CONTENT_URL_RE = re.compile(r"^/media/products/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$")
+
+
+# Файлы изображений адресуются sha256 содержимого: одинаковые загрузки — один файл.
+# media_files.refcount — сколько товаров ссылается на файл. Счётчик меняется в транзакции
+# вызывающего кода, а файл удаляется только после её коммита (purge_product_image),
+# отдельной транзакцией под блокировкой строки media_files. Загрузка того же файла
+# берёт ту же блокировку, так что загрузка и удаление одного файла выполняются по очереди.
+
+
+async def store_product_image(db: AsyncSession, file: UploadFile) -> str:
+    """
+    Принимает изображение, увеличивает счётчик ссылок и возвращает URL.
+    Если такой файл уже есть, новый на диск не пишется.
+    Вызывать до коммита транзакции, в которой сохраняется ссылка на URL.
+    """
+    image = await receive_image(file, PRODUCT_MEDIA_ROOT)
+    url = PRODUCT_MEDIA_URL + image.relative_path
+    try:
+        await db.execute(
+            insert(MediaFileModel)
+            .values(hash=image.digest, url=url, size=image.size, refcount=1)
+            .on_conflict_do_update(
+                index_elements=[MediaFileModel.hash],
+                set_={"refcount": MediaFileModel.refcount + 1},
+            )
+        )
+        # файл проверяем уже под блокировкой строки: его мог удалить purge, закоммитившийся только что
+        created = await run_in_threadpool(place_image, image, PRODUCT_MEDIA_ROOT)
+    except BaseException:
+        await run_in_threadpool(discard_image, image)
+        raise
+    if created:
+        schedule_variants(url)
+    return url
+
+
+async def release_product_image(db: AsyncSession, url: str | None) -> str | None:
+    """
+    Уменьшает счётчик ссылок в транзакции вызывающего кода; на последней ссылке удаляет строку.
+    Файл не трогает: возвращает URL, который после коммита нужно передать в purge_product_image,
+    или None, если на файл ещё ссылаются. Если транзакция откатится, файл остаётся на месте.
+    """
+    if not url:
+        return None
+    refcount = await db.scalar(
+        update(MediaFileModel)
+        .where(MediaFileModel.url == url)
+        .values(refcount=MediaFileModel.refcount - 1)
+        .returning(MediaFileModel.refcount)
+    )
+    if refcount is not None and refcount > 0:
+        return None
+    if refcount is not None:
+        await db.execute(delete(MediaFileModel).where(MediaFileModel.url == url))
+    # refcount is None — файл из старой схемы (uuid-имя) ещё не перенесён migrate_media, владелец один
+    return url
+
+
+async def purge_product_image(db: AsyncSession, url: str | None) -> None:
+    """
+    Удаляет файл и его производные, если на него так и нет ссылок. Вызывать после коммита
+    транзакции с release_product_image; выполняется своей транзакцией.
+    Строку media_files (или временную, с refcount 0) блокируем вставкой: параллельная загрузка
+    того же изображения ждёт, пока файл удаляется, и затем пишет его заново.
+    Если процесс упадёт между коммитом и удалением, файл подберёт migrate_media --gc.
+    """
+    if not url:
+        return
+    match = CONTENT_URL_RE.match(url)
+    if match is None:
+        await remove_media(url)
+        await remove_variants(url)
+        return
+    stmt = insert(MediaFileModel).values(hash=match[1], url=url, size=0, refcount=0)
+    refcount = await db.scalar(
+        stmt.on_conflict_do_update(
+            index_elements=[MediaFileModel.hash],
+            set_={"refcount": MediaFileModel.refcount},
+        ).returning(MediaFileModel.refcount)
+    )
+    try:
+        if refcount == 0:
+            await remove_media(url)
+            await remove_variants(url)
+            await db.execute(delete(MediaFileModel).where(MediaFileModel.hash == match[1]))
+    except BaseException:
+        await db.rollback()
+        raise
+    await db.commit()
@@ -0,0 +1,178 @@
+"""
+Перенос изображений товаров в контентно-адресуемое хранилище (app/tools/media_store.py).
+
+    python -m app.tools.migrate_media [--dry-run] [--gc]
+
+1. Каждый файл старой схемы (/media/products/<uuid>.<ext>), на который ссылается products.image_url,
+   хешируется и переносится в /media/products/ab/cd/<sha256>.<ext>. Одинаковые файлы сливаются
+   в один, ссылки в products обновляются, старые файлы удаляются после коммита.
+   Ссылки на уже несуществующие файлы обнуляются.
+2. media_files.refcount пересчитывается по products.image_url — так же чинятся расхождения после сбоев.
+3. --gc удаляет файлы хранилища без ссылок, оставшиеся файлы старой схемы
+   и временные файлы незавершённых загрузок.
+
+Запускать после миграции c5f18e3a9b27 (таблица media_files). Повторный запуск безопасен;
+--gc лучше запускать, когда товары не редактируются: файл, ставший живым во время обхода, может быть удалён.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+import app.models  # noqa: F401 — регистрирует все модели для relationship
+from app.database import async_session_maker
+from app.models.media_files import MediaFile as MediaFileModel
+from app.models.products import Product as ProductModel
+from app.tools.images import Image, generate_variants, IMAGE_VARIANT_WIDTHS, variant_path, variant_files
+from app.tools.media import BASE_DIR, PRODUCT_MEDIA_ROOT, UPLOAD_CHUNK_SIZE, ReceivedImage, media_path, sniff_image
+from app.tools.media_store import CONTENT_URL_RE, PRODUCT_MEDIA_URL
+
+
+STALE_UPLOAD_AGE = 3600  # секунд; более старые .upload-* считаются брошенными
+
+
+def hash_file(path: Path) -> ReceivedImage | None:
+    """
+    sha256 и формат существующего файла; tmp_path — сам файл.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as source:
+        head = source.read(UPLOAD_CHUNK_SIZE)
+        extension = sniff_image(head)
+        if extension is None:
+            return None
+        chunk = head
+        while chunk:
+            size += len(chunk)
+            digest.update(chunk)
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+    return ReceivedImage(path, digest.hexdigest(), extension, size)
+
+
+def link_into_store(image: ReceivedImage) -> Path:
+    """
+    Кладёт копию файла по адресу в хранилище, не трогая оригинал (его удаляем после коммита).
+    """
+    target = PRODUCT_MEDIA_ROOT / image.relative_path
+    if target.exists():
+        return target
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.tmp")
+    try:
+        os.link(image.tmp_path, tmp)  # тот же диск — без копирования данных
+    except OSError:
+        shutil.copy2(image.tmp_path, tmp)
+    os.replace(tmp, target)
+    return target
+
+
+def remove_with_variants(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    for variant in variant_files(path):
+        variant.unlink(missing_ok=True)
+
+
+async def migrate_legacy(dry_run: bool) -> None:
+    async with async_session_maker() as db:
+        urls = (await db.scalars(
+            select(ProductModel.image_url).where(ProductModel.image_url.is_not(None)).distinct()
+        )).all()
+        legacy = [url for url in urls if not CONTENT_URL_RE.match(url)]
+        moved: list[Path] = []
+        for url in legacy:
+            path = media_path(url)
+            image = hash_file(path) if path is not None and path.is_file() else None
+            if image is None:
+                print(f"missing or not an image, reference cleared: {url}")
+                new_url = None
+            else:
+                new_url = PRODUCT_MEDIA_URL + image.relative_path
+                print(f"{url} -> {new_url}")
+            if dry_run:
+                continue
+            if image is not None:
+                target = link_into_store(image)
+                moved.append(path)
+                if Image is not None and not variant_path(target, IMAGE_VARIANT_WIDTHS[0], ".webp").exists():
+                    await asyncio.to_thread(generate_variants, str(target))
+            await db.execute(update(ProductModel).where(ProductModel.image_url == url).values(image_url=new_url))
+        await db.commit()
+    for path in moved:
+        remove_with_variants(path)
+    print(f"legacy files: {len(legacy)}")
+
+
+async def recount(dry_run: bool) -> None:
+    async with async_session_maker() as db:
+        refs = dict((await db.execute(
+            select(ProductModel.image_url, func.count())
+            .where(ProductModel.image_url.is_not(None))
+            .group_by(ProductModel.image_url)
+        )).all())
+        for url, count in refs.items():
+            match = CONTENT_URL_RE.match(url)
+            path = media_path(url)
+            if match is None or path is None or not path.is_file():
+                print(f"skipped reference: {url}")
+                continue
+            stmt = insert(MediaFileModel).values(hash=match[1], url=url, size=path.stat().st_size, refcount=count)
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[MediaFileModel.hash], set_={"refcount": stmt.excluded.refcount}))
+        await db.execute(
+            update(MediaFileModel).where(MediaFileModel.url.not_in(refs or [""])).values(refcount=0)
+        )
+        if dry_run:
+            await db.rollback()
+        else:
+            await db.commit()
+    print(f"referenced files: {len(refs)}")
+
+
+async def collect_garbage(dry_run: bool) -> None:
+    async with async_session_maker() as db:
+        live = set((await db.scalars(select(MediaFileModel.url).where(MediaFileModel.refcount > 0))).all())
+        if not dry_run:
+            await db.execute(delete(MediaFileModel).where(MediaFileModel.refcount <= 0))
+            await db.commit()
+
+    removed = 0
+    now = time.time()
+    for path in PRODUCT_MEDIA_ROOT.rglob("*"):
+        if not path.is_file():
+            continue
+        url = "/" + path.relative_to(BASE_DIR).as_posix()
+        if path.name.startswith(".upload-") or path.name.endswith(".tmp"):
+            # незавершённые загрузки и записи производных
+            garbage = now - path.stat().st_mtime > STALE_UPLOAD_AGE
+        elif path.name.startswith("."):
+            garbage = False
+        elif path.parent == PRODUCT_MEDIA_ROOT:
+            # после migrate_legacy на файлы старой схемы никто не ссылается
+            garbage = True
+        else:
+            garbage = CONTENT_URL_RE.match(url) is not None and url not in live
+        if garbage:
+            print(f"remove {url}")
+            removed += 1
+            if not dry_run:
+                remove_with_variants(path)
+    print(f"removed files: {removed}")
+
+
+async def main(argv: list[str]) -> None:
+    dry_run = "--dry-run" in argv
+    await migrate_legacy(dry_run)
+    await recount(dry_run)
+    if "--gc" in argv:
+        await collect_garbage(dry_run)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
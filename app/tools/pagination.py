@@ -0,0 +1,43 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+
+
+MATCHERS = ("fts", "trigram")
+
+
+def encode_cursor(last_id: int, rank: float | None = None, matcher: str | None = None) -> str:
+    """
+    Кодирует ключ последней строки страницы в непрозрачный курсор.
+    Для обычного списка ключ — id, для поиска — (rank, id) и способ поиска.
+    """
+    payload: dict = {"id": last_id}
+    if rank is not None:
+        payload["rank"] = rank
+    if matcher is not None:
+        payload["m"] = matcher
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, float | None, str | None]:
+    """
+    Декодирует курсор и возвращает (last_id, rank, matcher).
+    Битый курсор — ошибка клиента, поэтому сразу отдаём 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = payload["id"]
+        rank = payload.get("rank")
+        matcher = payload.get("m")
+        if not isinstance(last_id, int) or isinstance(last_id, bool):
+            raise ValueError("id must be int")
+        if rank is not None and (isinstance(rank, bool) or not isinstance(rank, (int, float))):
+            raise ValueError("rank must be number")
+        if matcher is not None and matcher not in MATCHERS:
+            raise ValueError("unknown matcher")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return last_id, float(rank) if rank is not None else None, matcher
@@ -0,0 +1,78 @@
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cart_items import CartItem as CartItemModel
+from app.models.categories import Category as CategoryModel
+from app.models.products import Product as ProductModel
+from app.models.reviews import Review as ReviewModel
+from app.schemas import Category as CategorySchema, Product as ProductSchema, Review as ReviewSchema
+
+
+# Запросы только на чтение для горячих GET: Core select по колонкам схемы ответа.
+# Строки не попадают в identity map сессии и не отслеживаются — схемы Pydantic
+# и FastSerializer читают их так же, как ORM-объекты (по атрибутам).
+# Изменяющие эндпоинты по-прежнему работают с ORM.
+
+
+def _schema_columns(model, schema) -> list:
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+PRODUCT_READ_COLUMNS = _schema_columns(ProductModel, ProductSchema)
+CATEGORY_READ_COLUMNS = _schema_columns(CategoryModel, CategorySchema)
+REVIEW_READ_COLUMNS = _schema_columns(ReviewModel, ReviewSchema)
+
+
+class CartItemRecord:
+    """
+    Позиция корзины для чтения: строка cart_items и строка товара.
+    """
+    __slots__ = ("id", "quantity", "product")
+
+    def __init__(self, id: int, quantity: int, product: Row):
+        self.id = id
+        self.quantity = quantity
+        self.product = product
+
+
+async def fetch_product(db: AsyncSession, product_id: int) -> Row | None:
+    return (await db.execute(
+        select(*PRODUCT_READ_COLUMNS).where(ProductModel.id == product_id, ProductModel.is_active == True)
+    )).first()
+
+
+async def product_exists(db: AsyncSession, product_id: int) -> bool:
+    return await db.scalar(
+        select(ProductModel.id).where(ProductModel.id == product_id, ProductModel.is_active == True)
+    ) is not None
+
+
+async def fetch_active_categories(db: AsyncSession) -> list[Row]:
+    return list((await db.execute(
+        select(*CATEGORY_READ_COLUMNS).where(CategoryModel.is_active == True)
+    )).all())
+
+
+async def fetch_product_reviews(db: AsyncSession, product_id: int) -> list[Row]:
+    return list((await db.execute(
+        select(*REVIEW_READ_COLUMNS).where(ReviewModel.product_id == product_id, ReviewModel.is_active == True)
+    )).all())
+
+
+async def fetch_cart_items(db: AsyncSession, user_id: int) -> list[CartItemRecord]:
+    """
+    Корзина двумя запросами, как selectinload: позиции, затем их товары.
+    """
+    items = (await db.execute(
+        select(CartItemModel.id, CartItemModel.quantity, CartItemModel.product_id)
+        .where(CartItemModel.user_id == user_id)
+        .order_by(CartItemModel.id)
+    )).all()
+    if not items:
+        return []
+    products = {
+        row.id: row for row in (await db.execute(
+            select(*PRODUCT_READ_COLUMNS).where(ProductModel.id.in_({item.product_id for item in items}))
+        ))
+    }
+    return [CartItemRecord(item.id, item.quantity, products[item.product_id]) for item in items]
@@ -3,6 +3,8 @@ from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.reviews import Review as ReviewModel
 from app.models.products import Product as ProductModel
+from app.tools.cache import invalidate_product
+from app.tools.suggest import suggest_index
 
 
 async def update_product_rating(db: AsyncSession, product_id: int):
@@ -18,4 +20,6 @@ async def update_product_rating(db: AsyncSession, product_id: int):
     product.rating = avg_rating
 
     await db.commit()
-    await db.refresh(product)
\ No newline at end of file
+    await db.refresh(product)
+    invalidate_product(product_id)
+    suggest_index.product_saved(product)
\ No newline at end of file
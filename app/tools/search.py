@@ -0,0 +1,264 @@
+import heapq
+import math
+import re
+from abc import ABC, abstractmethod
+from array import array
+
+from sqlalchemy import Float, Integer, String, any_, bindparam, cast, column, false, func, literal, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import SEARCH_BACKEND
+from app.models.products import Product as ProductModel, SEARCH_CONFIGS
+
+
+class SearchBackend(ABC):
+    """
+    Интерфейс поиска товаров.
+    match() возвращает условие WHERE и выражение ранга — их подставляет
+    _build_product_filters, так что пагинация, total и фасеты работают с любым backend.
+    dialect — имя диалекта базы сессии (db.bind.dialect.name), если SQL от него зависит.
+    """
+    name = "base"
+    # поддерживает ли backend запасной нечёткий поиск по pg_trgm
+    fuzzy_fallback = False
+
+    async def build(self, db: AsyncSession) -> None:
+        pass
+
+    @abstractmethod
+    def match(self, query: str, lang: str, dialect: str):
+        ...
+
+    def product_saved(self, product: ProductModel) -> None:
+        pass
+
+    def product_removed(self, product_id: int) -> None:
+        pass
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Полнотекстовый поиск PostgreSQL по хранимому Product.tsv (GIN-индекс ix_products_tsv_gin).
+    """
+    name = "postgres"
+    fuzzy_fallback = True
+
+    def match(self, query: str, lang: str, dialect: str):
+        # auto — OR запросов всех конфигураций; tsv хранит лексемы каждой из них
+        configs = SEARCH_CONFIGS if lang == "auto" else (lang,)
+        ts_query = None
+        for config in configs:
+            part = func.websearch_to_tsquery(config, query)
+            ts_query = part if ts_query is None else ts_query.op('||')(part)
+        return ProductModel.tsv.op('@@')(ts_query), func.ts_rank_cd(ProductModel.tsv, ts_query)
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.casefold().replace("ё", "е"))
+
+
+class InvertedIndexSearchBackend(SearchBackend):
+    """
+    Инвертированный индекс в памяти процесса со скорингом BM25 — для развёртываний без PostgreSQL.
+
+    Документы нумеруются по порядку добавления; списки вхождений терминов — array('I')
+    номеров документов и array('H') частот, поэтому отсортированы и компактны.
+    Изменённый товар получает новый номер, старый помечается удалённым;
+    когда удалённых становится много, индекс перестраивается.
+    """
+    name = "memory"
+
+    K1 = 1.2
+    B = 0.75
+    NAME_WEIGHT = 2  # слова из названия весят как вес 'A' в tsv
+    COMPACT_RATIO = 0.25
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self) -> None:
+        self._terms: dict[str, int] = {}
+        self._postings: list[array] = []
+        self._freqs: list[array] = []
+        self._doc_product: array = array("I")
+        self._doc_len: array = array("I")
+        self._alive = bytearray()
+        self._product_doc: dict[int, int] = {}
+        self._total_len = 0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._product_doc)
+
+    async def build(self, db: AsyncSession) -> None:
+        self._reset()
+        result = await db.stream(
+            select(ProductModel.id, ProductModel.name, ProductModel.description)
+            .where(ProductModel.is_active == True)
+            .order_by(ProductModel.id)
+            .execution_options(yield_per=1000)
+        )
+        async for product_id, name, description in result:
+            self._add(product_id, name, description)
+
+    def product_saved(self, product: ProductModel) -> None:
+        self.product_removed(product.id)
+        if product.is_active:
+            self._add(product.id, product.name, product.description)
+
+    def product_removed(self, product_id: int) -> None:
+        doc = self._product_doc.pop(product_id, None)
+        if doc is None:
+            return
+        self._alive[doc] = 0
+        self._total_len -= self._doc_len[doc]
+        self._dead += 1
+        if self._dead > self.COMPACT_RATIO * len(self._alive):
+            self._compact()
+
+    def _add(self, product_id: int, name: str | None, description: str | None) -> None:
+        counts: dict[str, int] = {}
+        for token in tokenize(name):
+            counts[token] = counts.get(token, 0) + self.NAME_WEIGHT
+        for token in tokenize(description):
+            counts[token] = counts.get(token, 0) + 1
+
+        doc = len(self._doc_product)
+        length = sum(counts.values())
+        self._doc_product.append(product_id)
+        self._doc_len.append(length)
+        self._alive.append(1)
+        self._product_doc[product_id] = doc
+        self._total_len += length
+
+        for token, tf in counts.items():
+            term = self._terms.get(token)
+            if term is None:
+                term = self._terms[token] = len(self._postings)
+                self._postings.append(array("I"))
+                self._freqs.append(array("H"))
+            self._postings[term].append(doc)
+            self._freqs[term].append(min(tf, 0xFFFF))
+
+    def _compact(self) -> None:
+        """
+        Выкидывает удалённые документы и перенумеровывает живые.
+        """
+        remap = array("I", [0]) * len(self._alive)
+        doc_product, doc_len = array("I"), array("I")
+        for doc, alive in enumerate(self._alive):
+            if alive:
+                remap[doc] = len(doc_product)
+                doc_product.append(self._doc_product[doc])
+                doc_len.append(self._doc_len[doc])
+
+        terms: dict[str, int] = {}
+        postings, freqs = [], []
+        for token, term in self._terms.items():
+            new_docs, new_freqs = array("I"), array("H")
+            for doc, tf in zip(self._postings[term], self._freqs[term]):
+                if self._alive[doc]:
+                    new_docs.append(remap[doc])
+                    new_freqs.append(tf)
+            if new_docs:
+                terms[token] = len(postings)
+                postings.append(new_docs)
+                freqs.append(new_freqs)
+
+        self._terms, self._postings, self._freqs = terms, postings, freqs
+        self._doc_product, self._doc_len = doc_product, doc_len
+        self._alive = bytearray(b"\x01") * len(doc_product)
+        self._product_doc = {product_id: doc for doc, product_id in enumerate(doc_product)}
+        self._dead = 0
+
+    def search(self, query: str, limit: int | None = None) -> list[tuple[int, float]]:
+        """
+        Возвращает [(product_id, score)] по убыванию score; без limit — все совпадения.
+        """
+        scores = self._score(query)
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1]) if limit else \
+            sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [(self._doc_product[doc], score) for doc, score in top]
+
+    def _score(self, query: str) -> dict[int, float]:
+        """
+        BM25 всех совпавших документов: {doc: score}.
+        Как и websearch_to_tsquery, требует все слова запроса.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        live = len(self._product_doc)
+        if not tokens or not live:
+            return {}
+        terms = [self._terms.get(token) for token in tokens]
+        if any(term is None for term in terms):
+            return {}
+        # начинаем с самого редкого термина — меньше кандидатов
+        terms.sort(key=lambda term: len(self._postings[term]))
+
+        avg_len = self._total_len / live
+        scores: dict[int, float] | None = None
+        for term in terms:
+            docs, freqs = self._postings[term], self._freqs[term]
+            df = len(docs)  # вместе с удалёнными — до ближайшей перестройки
+            idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+            term_scores: dict[int, float] = {}
+            for doc, tf in zip(docs, freqs):
+                if not self._alive[doc] or (scores is not None and doc not in scores):
+                    continue
+                norm = self.K1 * (1 - self.B + self.B * self._doc_len[doc] / avg_len)
+                term_scores[doc] = idf * tf * (self.K1 + 1) / (tf + norm)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: scores[doc] + score for doc, score in term_scores.items()}
+            if not scores:
+                return {}
+        return scores
+
+    def match(self, query: str, lang: str, dialect: str):
+        """
+        В SQL уходят все совпадения, без отсечения по рангу: иначе total, фасеты и
+        пагинация видели бы только верхушку.
+        В PostgreSQL — два параметра вместо IN (...) на каждое совпадение: массив id
+        (= ANY, хешируемый в PostgreSQL 14+) и jsonb {id: score}, где ищется ранг строки.
+        В остальных базах (backend для них и нужен) — переносимый SQL: IN с раскрываемым
+        параметром и ранг из производной таблицы VALUES (id, score).
+        """
+        scores = self._score(query)
+        if not scores:
+            return false(), literal(0.0)
+        ranks = {self._doc_product[doc]: round(score, 6) for doc, score in scores.items()}
+        if dialect == "postgresql":
+            rank = literal({str(product_id): score for product_id, score in ranks.items()}, JSONB)
+            rank = rank[cast(ProductModel.id, String)].astext.cast(Float)
+            return ProductModel.id == any_(literal(list(ranks), ARRAY(Integer))), rank
+        return ProductModel.id.in_(bindparam("match_ids", list(ranks), expanding=True)), _values_rank(ranks)
+
+
+def _values_rank(ranks: dict[int, float]):
+    """
+    (SELECT column2 FROM (VALUES (id, score), ...) AS ranks WHERE column1 = products.id).
+    column1/column2 — имена столбцов VALUES по умолчанию и в SQLite, и в PostgreSQL;
+    CAST задаёт типы параметров, которые иначе не вывести.
+    """
+    rows, params = [], []
+    for i, (product_id, score) in enumerate(ranks.items()):
+        rows.append(f"(CAST(:rank_id_{i} AS INTEGER), CAST(:rank_score_{i} AS FLOAT))")
+        params += [bindparam(f"rank_id_{i}", product_id), bindparam(f"rank_score_{i}", score)]
+    table = (text("VALUES " + ", ".join(rows)).bindparams(*params)
+             .columns(column("column1", Integer), column("column2", Float)).subquery("ranks"))
+    return select(table.c.column2).where(table.c.column1 == ProductModel.id).scalar_subquery()
+
+def _create_backend() -> SearchBackend:
+    if SEARCH_BACKEND == "memory":
+        return InvertedIndexSearchBackend()
+    return PostgresSearchBackend()
+
+
+search_backend = _create_backend()
@@ -0,0 +1,102 @@
+from collections.abc import Callable
+from decimal import Decimal
+from types import NoneType, SimpleNamespace, UnionType
+from typing import Any, Union, get_args, get_origin
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него работает запасной путь через TypeAdapter
+    orjson = None
+
+
+def json_response(content: str | bytes, headers: dict[str, str] | None = None) -> Response:
+    """
+    Готовый JSON в обход response_model. Схема ответа в OpenAPI остаётся той, что в декораторе.
+    """
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def _default(value: Any) -> Any:
+    # Decimal в JSON — строкой, как у Pydantic
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _compile(annotation: Any) -> Callable[[Any], Any] | None:
+    """
+    Строит функцию «объект -> примитивы JSON» по аннотации схемы.
+    None — значение отдаётся как есть (int, str, bool, даты, Decimal).
+    """
+    if annotation is float:
+        # Numeric из БД приходит Decimal; Pydantic отдаёт float-поле числом, а не строкой
+        return float
+    origin = get_origin(annotation)
+    if origin in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not NoneType]
+        dump = _compile(args[0]) if len(args) == 1 else None
+        if dump is None:
+            return None
+        return lambda value: None if value is None else dump(value)
+    if origin is list:
+        item = _compile(get_args(annotation)[0])
+        if item is None:
+            return list
+        return lambda value: [item(entry) for entry in value]
+    if origin is dict:
+        item = _compile(get_args(annotation)[1])
+        if item is None:
+            return dict
+        return lambda value: {key: item(entry) for key, entry in value.items()}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _compile_model(annotation)
+    return None
+
+
+def _compile_model(schema: type[BaseModel]) -> Callable[[Any], dict]:
+    plan = [
+        (name, _compile(info.annotation), info.get_default(call_default_factory=True))
+        for name, info in schema.model_fields.items()
+    ]
+    # @computed_field считается тем же свойством, но от исходного объекта
+    computed = [
+        (name, _compile(info.return_type), info.wrapped_property.fget)
+        for name, info in schema.model_computed_fields.items()
+    ]
+
+    def dump(obj: Any) -> dict:
+        # ORM-объект, модель Pydantic или словарь, который эндпоинт собрал сам
+        if isinstance(obj, dict):
+            values = [(name, obj.get(name, default), fn) for name, fn, default in plan]
+            source = SimpleNamespace(**obj) if computed else None
+        else:
+            values = [(name, getattr(obj, name, default), fn) for name, fn, default in plan]
+            source = obj
+        values += [(name, getter(source), fn) for name, fn, getter in computed]
+        return {name: value if fn is None or value is None else fn(value) for name, value, fn in values}
+
+    return dump
+
+
+class FastSerializer:
+    """
+    Сериализует ответ сразу в bytes по заранее разобранной схеме, без валидации
+    в модель и промежуточного dict от FastAPI. Данные должны уже соответствовать схеме —
+    это ответ из БД, а не ввод пользователя.
+    С orjson: обход атрибутов по плану + orjson.dumps. Без него: TypeAdapter.dump_json.
+    """
+
+    def __init__(self, schema: Any):
+        self.adapter = TypeAdapter(schema)
+        self._dump = _compile(schema) or (lambda value: value)
+
+    def dumps(self, data: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(self._dump(data), default=_default, option=orjson.OPT_UTC_Z)
+        return self.adapter.dump_json(self.adapter.validate_python(data, from_attributes=True))
+
+    def response(self, data: Any, headers: dict[str, str] | None = None) -> Response:
+        return json_response(self.dumps(data), headers)
@@ -0,0 +1,228 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from collections.abc import Iterable
+from itertools import groupby
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.products import Product as ProductModel
+from app.models.categories import Category as CategoryModel
+
+
+MEMO_PREFIX_LEN = 2  # короткие префиксы дают длинные диапазоны — их топ держим готовым
+MAX_SUGGEST_LIMIT = 20
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.casefold().replace("ё", "е")))
+
+
+def _word_suffixes(title: str) -> tuple[str, ...]:
+    """
+    Ключи для названия: хвосты строки от начала каждого слова.
+    "Red Apple iPhone" -> "red apple iphone", "apple iphone", "iphone".
+    """
+    words = normalize(title).split()
+    return tuple(" ".join(words[i:]) for i in range(len(words)))
+
+
+class PrefixIndex:
+    """
+    Префиксный индекс в памяти: отсортированный массив (ключ, id) и бинарный поиск.
+    Топ по score для коротких префиксов считается при загрузке и поддерживается при изменениях:
+    диапазоны для них длинные, сканировать их на запросе дорого.
+    """
+
+    def __init__(self):
+        self._keys: list[tuple[str, int]] = []
+        self._items: dict[int, tuple[str, float, tuple[str, ...]]] = {}
+        self._memo: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def load(self, items: Iterable[tuple[int, str, float]]) -> None:
+        """
+        Полная загрузка: ключи сортируются один раз, а не вставляются по одному.
+        """
+        self.clear()
+        keys = []
+        for item_id, title, score in items:
+            item_keys = _word_suffixes(title)
+            self._items[item_id] = (title, score, item_keys)
+            keys.extend((key, item_id) for key in item_keys)
+        keys.sort()
+        self._keys = keys
+        self._warm_memo()
+
+    def add(self, item_id: int, title: str, score: float) -> None:
+        """
+        Добавляет или заменяет элемент.
+        """
+        old = self._items.get(item_id)
+        keys = _word_suffixes(title)
+        old_keys = old[2] if old is not None else ()
+        if old_keys != keys:
+            for key in old_keys:
+                self._delete_key(key, item_id)
+            for key in keys:
+                insort(self._keys, (key, item_id))
+        self._items[item_id] = (title, score, keys)
+        self._update_memo(item_id, old_keys, keys)
+
+    def remove(self, item_id: int) -> None:
+        old = self._items.pop(item_id, None)
+        if old is None:
+            return
+        for key in old[2]:
+            self._delete_key(key, item_id)
+        self._update_memo(item_id, old[2], ())
+
+    def score(self, item_id: int) -> float | None:
+        item = self._items.get(item_id)
+        return item[1] if item else None
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._items.clear()
+        self._memo.clear()
+
+    def search(self, prefix: str, limit: int = 10) -> list[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        memo_key = prefix if len(prefix) <= MEMO_PREFIX_LEN else None
+        ids = self._memo.get(memo_key) if memo_key else None
+        if ids is None:
+            ids = self._top(prefix, MAX_SUGGEST_LIMIT)
+            if memo_key:
+                self._memo[memo_key] = ids
+        return [
+            {"id": item_id, "name": self._items[item_id][0], "score": self._items[item_id][1]}
+            for item_id in ids[:limit]
+        ]
+
+    def _top(self, prefix: str, limit: int) -> list[int]:
+        matched: set[int] = set()
+        pos = bisect_left(self._keys, (prefix,))
+        while pos < len(self._keys) and self._keys[pos][0].startswith(prefix):
+            matched.add(self._keys[pos][1])
+            pos += 1
+        return heapq.nlargest(limit, matched, key=lambda item_id: (self._items[item_id][1], -item_id))
+
+    def _rank(self, item_id: int) -> tuple[float, int]:
+        return self._items[item_id][1], -item_id
+
+    def _delete_key(self, key: str, item_id: int) -> None:
+        pos = bisect_left(self._keys, (key, item_id))
+        if pos < len(self._keys) and self._keys[pos] == (key, item_id):
+            del self._keys[pos]
+
+    def _warm_memo(self) -> None:
+        # ключи отсортированы: элементы двухсимвольного префикса идут подряд. Топ односимвольного —
+        # среди топов его двухсимвольных продолжений и ключей из одного символа
+        rank = {item_id: (item[1], -item_id) for item_id, item in self._items.items()}
+        memo: dict[str, list[int]] = {}
+        candidates: dict[str, set[int]] = defaultdict(set)
+        for prefix, group in groupby(self._keys, key=lambda entry: entry[0][:MEMO_PREFIX_LEN]):
+            ids = {item_id for _, item_id in group}
+            if len(prefix) < MEMO_PREFIX_LEN:
+                candidates[prefix] |= ids
+                continue
+            memo[prefix] = heapq.nlargest(MAX_SUGGEST_LIMIT, ids, key=rank.__getitem__)
+            candidates[prefix[0]].update(memo[prefix])
+        for prefix, ids in candidates.items():
+            memo[prefix] = heapq.nlargest(MAX_SUGGEST_LIMIT, ids, key=rank.__getitem__)
+        self._memo = memo
+
+    def _update_memo(self, item_id: int, old_keys: tuple[str, ...], new_keys: tuple[str, ...]) -> None:
+        """
+        Переставляет элемент в готовых топах затронутых префиксов.
+        Топ короче MAX_SUGGEST_LIMIT содержит все совпадения префикса. Если из полного топа элемент
+        ушёл или опустился ниже последнего, замена неизвестна — такой топ сбрасывается и
+        пересчитается на следующем запросе.
+        """
+        prefixes = {key[:length] for key in old_keys + new_keys for length in range(1, MEMO_PREFIX_LEN + 1)}
+        for prefix in prefixes:
+            ids = self._memo.get(prefix)
+            if ids is None:
+                continue
+            full = len(ids) >= MAX_SUGGEST_LIMIT
+            listed = item_id in ids
+            if listed:
+                ids.remove(item_id)
+            if not any(key.startswith(prefix) for key in new_keys):
+                if listed and full:
+                    del self._memo[prefix]
+                continue
+            rank = self._rank(item_id)
+            pos = sum(1 for other in ids if self._rank(other) > rank)
+            if pos < len(ids) or not full:
+                ids.insert(pos, item_id)
+                del ids[MAX_SUGGEST_LIMIT:]
+            elif listed:
+                del self._memo[prefix]
+
+
+class SuggestIndex:
+    """
+    Подсказки поиска: активные товары (по рейтингу) и категории (по числу активных товаров).
+    Строится при старте приложения и обновляется из обработчиков записи.
+    """
+
+    def __init__(self):
+        self.products = PrefixIndex()
+        self.categories = PrefixIndex()
+
+    async def build(self, db: AsyncSession) -> None:
+        products = await db.execute(
+            select(ProductModel.id, ProductModel.name, ProductModel.rating)
+            .where(ProductModel.is_active == True)
+        )
+        self.products.load((product_id, name, float(rating or 0)) for product_id, name, rating in products)
+
+        product_counts = (
+            select(ProductModel.category_id, func.count().label("cnt"))
+            .where(ProductModel.is_active == True)
+            .group_by(ProductModel.category_id)
+            .subquery()
+        )
+        categories = await db.execute(
+            select(CategoryModel.id, CategoryModel.name, func.coalesce(product_counts.c.cnt, 0))
+            .outerjoin(product_counts, product_counts.c.category_id == CategoryModel.id)
+            .where(CategoryModel.is_active == True)
+        )
+        self.categories.load(categories)
+
+    def product_saved(self, product: ProductModel) -> None:
+        if product.is_active:
+            self.products.add(product.id, product.name, float(product.rating or 0))
+        else:
+            self.products.remove(product.id)
+
+    def product_removed(self, product_id: int) -> None:
+        self.products.remove(product_id)
+
+    def category_saved(self, category: CategoryModel) -> None:
+        if category.is_active:
+            # число товаров пересчитывается только при полной перестройке
+            self.categories.add(category.id, category.name, self.categories.score(category.id) or 0)
+        else:
+            self.categories.remove(category.id)
+
+    def category_removed(self, category_id: int) -> None:
+        self.categories.remove(category_id)
+
+    def search(self, q: str, limit: int = 10) -> dict:
+        return {
+            "products": self.products.search(q, limit),
+            "categories": self.categories.search(q, limit),
+        }
+
+
+suggest_index = SuggestIndex()
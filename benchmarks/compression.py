@@ -0,0 +1,57 @@
+"""
+Размер и CPU сжатия страницы ProductList по кодировкам и выигрыш от кэша сжатых тел.
+База данных не нужна — страница та же, что в benchmarks.serialization.
+
+    python -m benchmarks.compression [размер страницы]
+
+codec — сжатие тела целиком, как его делает CompressionMiddleware на промахе кэша.
+cached — ответ с тем же ETag через middleware: тело берётся из compressed_cache.
+"""
+import sys
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.schemas import ProductList
+from app.tools.compression import CODECS, CompressionMiddleware, compressed_cache
+from app.tools.serialization import FastSerializer
+from benchmarks.serialization import make_page
+
+
+RUNS = 200
+
+
+def measure(fn) -> float:
+    start = time.process_time()
+    for _ in range(RUNS):
+        fn()
+    return (time.process_time() - start) / RUNS * 1000
+
+
+def main(size: int) -> None:
+    body = FastSerializer(ProductList).dumps(make_page(size))
+    print(f"page_size={size} identity={len(body)} bytes runs={RUNS}")
+    for encoding, (compress, _) in CODECS.items():
+        ms = measure(lambda: compress(body))
+        compressed = compress(body)
+        print(f"{encoding:<6} {ms:.3f} ms CPU/request  {len(compressed)} bytes  x{len(body) / len(compressed):.1f}")
+
+    async def endpoint(request):
+        return Response(body, media_type="application/json", headers={"ETag": 'W/"page"'})
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    app.add_middleware(CompressionMiddleware)
+    client = TestClient(app)
+    for encoding in CODECS:
+        headers = {"Accept-Encoding": encoding}
+        compressed_cache.clear()
+        cold_ms = measure(lambda: (compressed_cache.clear(), client.get("/", headers=headers)))
+        hot_ms = measure(lambda: client.get("/", headers=headers))
+        print(f"{encoding:<6} middleware: miss {cold_ms:.3f} ms, hit {hot_ms:.3f} ms CPU/request")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
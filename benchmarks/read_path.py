@@ -0,0 +1,75 @@
+"""
+Чтение 1000 товаров через ORM против Core select по колонкам схемы (app/tools/read_queries.py).
+
+    python -m benchmarks.read_path [число строк]
+
+orm  — select(Product): объекты в identity map, все колонки, включая tsv.
+core — select(*PRODUCT_READ_COLUMNS): Row без отслеживания, только поля ответа.
+Для каждого варианта: медиана времени запроса с гидратацией и пик выделенной памяти (tracemalloc),
+плюс время сериализации в JSON через FastSerializer.
+"""
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401 — регистрирует все модели для relationship
+from app.database import DATABASE_URL
+from app.models.products import Product as ProductModel
+from app.schemas import Product as ProductSchema
+from app.tools.read_queries import PRODUCT_READ_COLUMNS
+from app.tools.serialization import FastSerializer
+
+
+RUNS = 20
+
+
+async def load_orm(db: AsyncSession, limit: int) -> list:
+    return list((await db.scalars(select(ProductModel).order_by(ProductModel.id).limit(limit))).all())
+
+
+async def load_core(db: AsyncSession, limit: int) -> list:
+    return list((await db.execute(select(*PRODUCT_READ_COLUMNS).order_by(ProductModel.id).limit(limit))).all())
+
+
+async def measure(session_maker, loader, limit: int) -> tuple[float, float, int, int]:
+    serializer = FastSerializer(list[ProductSchema])
+    timings, dump_timings, peak, rows = [], [], 0, 0
+    for _ in range(RUNS):
+        # новая сессия на каждый прогон — как новый запрос
+        async with session_maker() as db:
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = await loader(db, limit)
+            timings.append((time.perf_counter() - start) * 1000)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            serializer.dumps(result)
+            dump_timings.append((time.perf_counter() - start) * 1000)
+            rows = len(result)
+    return statistics.median(timings), statistics.median(dump_timings), peak, rows
+
+
+async def main(limit: int) -> None:
+    engine = create_async_engine(DATABASE_URL)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    # прогрев пула соединений и кэша компиляции запросов
+    async with session_maker() as db:
+        await load_orm(db, limit)
+        await load_core(db, limit)
+
+    for name, loader in (("orm", load_orm), ("core", load_core)):
+        query_ms, dump_ms, peak, rows = await measure(session_maker, loader, limit)
+        print(f"{name:5} rows={rows:<5} query+hydrate={query_ms:.2f}ms "
+              f"serialize={dump_ms:.2f}ms peak_alloc={peak / 1024:.0f}KiB")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,73 @@
+"""
+Сравнение планов и времени поиска до и после многоязычного tsv.
+
+    python -m benchmarks.search_languages "чехол для телефона" "iphone case"
+
+before_en — старый запрос: tsv @@ websearch_to_tsquery('english', q). Индекс есть,
+            но русские слова не стеммируются, поэтому результатов мало.
+before_ru — русский поиск без многоязычного tsv: to_tsvector('russian', ...) на лету.
+            Стемминг правильный, но GIN-индекс не используется и идёт seq scan.
+after     — новый запрос: tsv @@ (russian || english), стемминг правильный и индекс используется.
+"""
+import asyncio
+import json
+import statistics
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import DATABASE_URL
+
+
+RUNS = 20
+
+QUERIES = {
+    "before_en": """
+        SELECT id FROM products
+        WHERE is_active AND tsv @@ websearch_to_tsquery('english', :q)
+    """,
+    "before_ru": """
+        SELECT id FROM products
+        WHERE is_active
+          AND to_tsvector('russian', coalesce(name, '') || ' ' || coalesce(description, ''))
+              @@ websearch_to_tsquery('russian', :q)
+    """,
+    "after": """
+        SELECT id FROM products
+        WHERE is_active
+          AND tsv @@ (websearch_to_tsquery('russian', :q) || websearch_to_tsquery('english', :q))
+    """,
+}
+
+
+def _node_types(plan: dict) -> list[str]:
+    nodes = [plan["Node Type"] + (f" ({plan['Index Name']})" if "Index Name" in plan else "")]
+    for child in plan.get("Plans", []):
+        nodes.extend(_node_types(child))
+    return nodes
+
+
+async def main(search_terms: list[str]) -> None:
+    engine = create_async_engine(DATABASE_URL)
+    async with engine.connect() as conn:
+        for term in search_terms:
+            print(f"\n=== {term!r}")
+            for name, sql in QUERIES.items():
+                timings = []
+                plan = None
+                for _ in range(RUNS):
+                    result = await conn.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + sql), {"q": term})
+                    explained = result.scalar()
+                    if isinstance(explained, str):
+                        explained = json.loads(explained)
+                    plan = explained[0]
+                    timings.append(plan["Execution Time"])
+                print(f"{name:10} rows={plan['Plan']['Actual Rows']:<6} "
+                      f"median={statistics.median(timings):.3f}ms "
+                      f"plan={' -> '.join(_node_types(plan['Plan']))}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:] or ["телефон", "phone"]))
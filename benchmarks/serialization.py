@@ -0,0 +1,76 @@
+"""
+CPU на сериализацию страницы ProductList из 100 товаров: путь FastAPI через response_model
+против FastSerializer. База данных не нужна — товары собираются как ORM-объекты в памяти.
+
+    python -m benchmarks.serialization [размер страницы]
+
+response_model — что делает FastAPI: валидация в ProductList, dump_python(mode="json"), json.dumps.
+fast           — FastSerializer.dumps: обход по заранее разобранной схеме и orjson (или TypeAdapter).
+"""
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi.routing import serialize_response
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_model_field
+
+import app.models  # noqa: F401 — регистрирует все модели для relationship
+from app.models.products import Product as ProductModel
+from app.schemas import ProductList
+from app.tools.serialization import FastSerializer, orjson
+
+
+RUNS = 500
+
+
+def make_page(size: int) -> dict:
+    now = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+    items = [
+        ProductModel(
+            id=i, name=f"Товар {i}", description="Описание товара " * 20, price=Decimal("1999.90"),
+            image_url=f"/media/products/{i}.jpg", stock=i % 7, category_id=i % 10 + 1, seller_id=1,
+            is_active=True, rating=Decimal("4.50"), created_at=now, updated_at=now,
+        )
+        for i in range(1, size + 1)
+    ]
+    return {"items": items, "total": 10_000, "total_exact": True, "page": 1, "page_size": size,
+            "next_cursor": "eyJpZCI6MTAwfQ", "matcher": None, "facets": None}
+
+
+async def via_response_model(field, page: dict) -> bytes:
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+def measure(fn) -> float:
+    start = time.process_time()
+    for _ in range(RUNS):
+        fn()
+    return (time.process_time() - start) / RUNS * 1000
+
+
+def main(size: int) -> None:
+    import asyncio
+
+    page = make_page(size)
+    field = create_model_field(name="Response", type_=ProductList, mode="serialization")
+    serializer = FastSerializer(ProductList)
+    loop = asyncio.new_event_loop()
+
+    baseline = loop.run_until_complete(via_response_model(field, page))
+    fast = serializer.dumps(page)
+    # rating в БД — Numeric (Decimal), в схеме — float: сравниваем побайтно, а не после json.loads
+    assert baseline == fast, f"ответы различаются:\n{baseline[:300]}\n{fast[:300]}"
+
+    slow_ms = measure(lambda: loop.run_until_complete(via_response_model(field, page)))
+    fast_ms = measure(lambda: serializer.dumps(page))
+    print(f"page_size={size} encoder={'orjson' if orjson else 'pydantic'} runs={RUNS}")
+    print(f"response_model  {slow_ms:.3f} ms CPU/request  {len(baseline)} bytes")
+    print(f"fast            {fast_ms:.3f} ms CPU/request  {len(fast)} bytes  x{slow_ms / fast_ms:.1f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)